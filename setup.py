@@ -7,4 +7,4 @@ setup(name='testlio',
       author_email='',
       url='',
       packages=find_packages(),
-      install_requires=['selenium', 'pytz'])
+      install_requires=['selenium', 'pytz', 'urllib3'])
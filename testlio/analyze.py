@@ -0,0 +1,310 @@
+"""
+Where does the time of a test run go.
+
+Reads event logs (json lines written by EventLogger and the calabash format of
+testdroid runs) on a process pool and reports per test duration, the slowest
+steps, time per action type and element, and failure hot spots as json or csv.
+
+    python -m testlio.analyze ./logs --top 20 --format csv --output report.csv
+
+A step is an event together with the time since the previous event of the same
+test, events are logged when the action completed.
+"""
+
+import argparse
+import csv
+import datetime
+import heapq
+import json
+import multiprocessing
+import os
+import re
+import sys
+
+try:
+    from testlio.log import DIR
+except ImportError:
+    from log import DIR
+
+ISO_FORMATS = ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S')
+CALABASH_STEP = re.compile(r'^\s*(Then|Step unsuccessful:) (\d\d:\d\d:\d\d) - (.*?)\s*# features/step_definitions')
+CALABASH_FEATURE = re.compile(r'^Feature: (.*)$')
+CALABASH_SCENARIO = re.compile(r'^\s*Scenario: (\S+)')
+FAILURE_MARKERS = ('*** FAILURE ***', 'Soft failures found')
+# A log and the segments it was rotated into: A.test.log, A.test.log.1, ...
+LOG_FILE = re.compile(r'\.log(\.\d+)?$')
+# Events about the run rather than steps of the test
+SKIPPED_EVENTS = ('span', 'latency', 'lifecycle')
+
+
+def parse_json_line(line):
+    """Event of a json log line as (timestamp, type, element, failed), None for other lines"""
+
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or 'timestamp' not in data:
+        return None
+
+    timestamp = _parse_iso(data['timestamp'])
+    if timestamp is None:
+        return None
+
+    if 'error' in data:
+        event_type, failed = 'error', True
+    elif 'event' in data:
+        event_type = data['event'].get('type')
+        if event_type in SKIPPED_EVENTS:
+            return None
+        failed = _is_failure(data['event'].get('data'))
+    else:
+        event_type, failed = 'screenshot', False
+
+    element = json.dumps(data['element'], sort_keys=True) if data.get('element') else None
+    if failed and not element and 'event' in data:
+        # failed verifications name the missing element in their message
+        element = data['event'].get('data')
+    return timestamp, event_type, element, failed
+
+
+def parse_calabash_line(line, day):
+    """
+    Step of a calabash log line as (timestamp, type, element, failed), the format
+    only has the time of day so day is the date to put it on
+    """
+
+    match = CALABASH_STEP.match(line)
+    if not match:
+        return None
+
+    keyword, time_of_day, body = match.groups()
+    timestamp = datetime.datetime.combine(day, datetime.datetime.strptime(time_of_day, '%H:%M:%S').time())
+    event_type, _, rest = body.partition(' ')
+    if event_type in SKIPPED_EVENTS:
+        return None
+
+    element = None
+    if rest.startswith('"{'):
+        # _format_dict_data writes: type "{element} "data"
+        element = rest[1:].split(' "', 1)[0]
+    return timestamp, event_type, element, keyword != 'Then' or _is_failure(rest)
+
+
+def _parse_iso(value):
+    for iso_format in ISO_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, iso_format)
+        except ValueError:
+            pass
+    return None
+
+
+def _is_failure(data):
+    return isinstance(data, (str, type(u''))) and any(marker in data for marker in FAILURE_MARKERS)
+
+
+def _read_events(path):
+    """Yield (test, event) for every event of a log file"""
+
+    test = LOG_FILE.sub('', os.path.basename(path))
+    day = datetime.date(1970, 1, 1)
+    feature = None
+    previous = None
+
+    with open(path) as log_file:
+        for line in log_file:
+            stripped = line.strip()
+            if stripped.startswith('{'):
+                event = parse_json_line(stripped)
+            else:
+                feature_match = CALABASH_FEATURE.match(stripped)
+                scenario_match = CALABASH_SCENARIO.match(line)
+                if feature_match:
+                    feature = feature_match.group(1).split('.')[-1]
+                    continue
+                if scenario_match:
+                    test = '%s.%s' % (feature, scenario_match.group(1)) if feature else scenario_match.group(1)
+                    continue
+
+                event = parse_calabash_line(line, day)
+                if event and previous and event[0] < previous:
+                    # past midnight
+                    day += datetime.timedelta(days=1)
+                    event = (event[0] + datetime.timedelta(days=1),) + event[1:]
+
+            if event:
+                previous = event[0]
+                yield test, event
+
+
+def analyze_file(path):
+    """Per test summaries of one log file: duration, steps, largest gap and failures"""
+
+    tests = {}
+    last = {}
+    for test, (timestamp, event_type, element, failed) in _read_events(path):
+        summary = tests.get(test)
+        if summary is None:
+            summary = tests[test] = {'test': test, 'file': LOG_FILE.sub('.log', path), 'start': timestamp, 'end': timestamp,
+                                     'events': 0, 'max_gap': 0.0, 'steps': [], 'failures': []}
+
+        gap = (timestamp - last[test]).total_seconds() if test in last else 0.0
+        last[test] = timestamp
+
+        summary['events'] += 1
+        summary['start'] = min(summary['start'], timestamp)
+        summary['end'] = max(summary['end'], timestamp)
+        summary['max_gap'] = max(summary['max_gap'], gap)
+        summary['steps'].append((gap, event_type, element))
+        if failed:
+            summary['failures'].append((event_type, element))
+
+    return list(tests.values())
+
+
+def log_files(paths):
+    """Log files of paths, directories are searched for *.log and their rotated segments"""
+
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if LOG_FILE.search(name):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def analyze(paths, jobs=None, top=20):
+    """Report over all log files in paths, files are parsed on jobs processes"""
+
+    tests = {}
+    slowest = []
+    actions = {}
+    elements = {}
+    failures = {}
+
+    pool = multiprocessing.Pool(jobs)
+    try:
+        for file_tests in pool.imap_unordered(analyze_file, log_files(paths), chunksize=8):
+            for summary in file_tests:
+                for gap, event_type, element in summary.pop('steps'):
+                    step = (gap, summary['test'], event_type or '', element or '')
+                    if len(slowest) < top:
+                        heapq.heappush(slowest, step)
+                    else:
+                        heapq.heappushpop(slowest, step)
+                    _add(actions, event_type, gap)
+                    if element:
+                        _add(elements, '%s %s' % (event_type, element), gap)
+                for event_type, element in summary['failures']:
+                    key = '%s %s' % (event_type, element) if element else event_type
+                    failures[key] = failures.get(key, 0) + 1
+                summary['failures'] = len(summary['failures'])
+                _merge(tests, summary)
+    finally:
+        pool.close()
+        pool.join()
+
+    for summary in tests.values():
+        summary['duration'] = (summary['end'] - summary['start']).total_seconds()
+        summary['start'] = summary['start'].isoformat()
+        summary['end'] = summary['end'].isoformat()
+
+    return {
+        'tests': sorted(tests.values(), key=lambda summary: -summary['duration']),
+        'slowest_steps': [{'test': test, 'type': event_type, 'element': element or None, 'seconds': gap}
+                          for gap, test, event_type, element in sorted(slowest, reverse=True)],
+        'actions': _ranked(actions),
+        'elements': _ranked(elements)[:top],
+        'failures': [{'key': key, 'count': count}
+                     for key, count in sorted(failures.items(), key=lambda item: -item[1])][:top]
+    }
+
+
+def _merge(tests, summary):
+    """Combine the summaries of one test read from several segments of its log"""
+
+    merged = tests.get(summary['test'])
+    if merged is None:
+        tests[summary['test']] = summary
+        return
+
+    merged['start'] = min(merged['start'], summary['start'])
+    merged['end'] = max(merged['end'], summary['end'])
+    merged['events'] += summary['events']
+    merged['failures'] += summary['failures']
+    merged['max_gap'] = max(merged['max_gap'], summary['max_gap'])
+
+
+def _add(totals, key, seconds):
+    total = totals.setdefault(key, {'key': key, 'count': 0, 'seconds': 0.0, 'max': 0.0})
+    total['count'] += 1
+    total['seconds'] += seconds
+    total['max'] = max(total['max'], seconds)
+
+
+def _ranked(totals):
+    ranked = sorted(totals.values(), key=lambda total: -total['seconds'])
+    for total in ranked:
+        total['mean'] = total['seconds'] / total['count']
+    return ranked
+
+
+class _Utf8Writer(object):
+    """csv writer of python 2 can't write unicode, its cells go in as utf-8"""
+
+    def __init__(self, target):
+        super(_Utf8Writer, self).__init__()
+
+        self._writer = csv.writer(target)
+
+    def writerow(self, row):
+        self._writer.writerow([cell.encode('utf-8') if isinstance(cell, type(u'')) else cell for cell in row])
+
+
+def write_csv(report, target):
+    """One table, the section column tells which part of the report a row belongs to"""
+
+    writer = csv.writer(target) if str is not bytes else _Utf8Writer(target)
+    writer.writerow(['section', 'key', 'count', 'seconds', 'mean', 'max'])
+    for summary in report['tests']:
+        writer.writerow(['test', summary['test'], summary['events'], summary['duration'], '', summary['max_gap']])
+    for step in report['slowest_steps']:
+        writer.writerow(['step', '%s %s %s' % (step['test'], step['type'], step['element'] or ''),
+                         1, step['seconds'], step['seconds'], step['seconds']])
+    for section in ('actions', 'elements'):
+        for total in report[section]:
+            writer.writerow([section[:-1], total['key'], total['count'], total['seconds'], total['mean'],
+                             total['max']])
+    for failure in report['failures']:
+        writer.writerow(['failure', failure['key'], failure['count'], '', '', ''])
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m testlio.analyze',
+                                     description='Step timing, slowest actions and failure hot spots of event logs')
+    parser.add_argument('paths', nargs='*', default=[DIR], help='log files or directories (default: %s)' % DIR)
+    parser.add_argument('--jobs', type=int, default=None, help='parser processes (default: cpu count)')
+    parser.add_argument('--top', type=int, default=20, help='number of slowest steps, elements and failures')
+    parser.add_argument('--format', choices=('json', 'csv'), default='json')
+    parser.add_argument('--output', help='report file (default: stdout)')
+    options = parser.parse_args(args)
+
+    report = analyze(options.paths, options.jobs, options.top)
+    target = open(options.output, 'w') if options.output else sys.stdout
+    try:
+        if options.format == 'csv':
+            write_csv(report, target)
+        else:
+            json.dump(report, target, indent=2, sort_keys=True)
+            target.write('\n')
+    finally:
+        if options.output:
+            target.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
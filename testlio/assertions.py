@@ -0,0 +1,64 @@
+from datetime import datetime
+
+
+class SoftAssertions(object):
+    """Soft assertion failures collected during a single test"""
+
+    def __init__(self, on_failure=None):
+        super(SoftAssertions, self).__init__()
+
+        # Called after every recorded failure, e.g. to sync the event log
+        self.on_failure = on_failure
+        self.failures = []
+        self._failing = 0
+        self._batch_hashes = set()
+
+    @property
+    def failed(self):
+        return self._failing > 0
+
+    def add(self, message, selector=None, screenshot=None, fails_test=True):
+        """
+        Record a soft failure. With fails_test=False it is only reported along
+        with the failures that do fail the test
+        """
+
+        self.failures.append({
+            'message': message,
+            'selector': selector,
+            'screenshot': screenshot,
+            'timestamp': datetime.utcnow().isoformat(),
+            'fails_test': fails_test
+        })
+        if fails_test:
+            self._failing += 1
+        if self.on_failure:
+            self.on_failure()
+
+    def first_batch(self, data):
+        """True the first time a batch with this data is seen during the test"""
+
+        batch_hash = hash(str(data))
+        if batch_hash in self._batch_hashes:
+            return False
+        self._batch_hashes.add(batch_hash)
+        return True
+
+    def batch_hashes(self):
+        """Hashes of the batches seen, as verify_in_batch kept them in HASHED_VALUES"""
+
+        return ''.join('%s ' % batch_hash for batch_hash in self._batch_hashes)
+
+    def summary(self):
+        """All failure messages, one per line"""
+
+        messages = [failure['message'] for failure in self.failures]
+        try:
+            return ''.join('\n' + message for message in messages)
+        except UnicodeError:
+            return ''.join('\n' + message.decode('utf-8', 'ignore') for message in messages)
+
+    def clear(self):
+        self.failures = []
+        self._failing = 0
+        self._batch_hashes.clear()
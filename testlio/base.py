@@ -1,9 +1,10 @@
+import json
 import os
 import re
 import threading
 import time
 import unittest
-from datetime import datetime, timedelta
+from functools import wraps
 from time import sleep, time
 
 from appium import webdriver
@@ -11,23 +12,62 @@ from selenium import webdriver as seleniumdriver
 from selenium.common.exceptions import *
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 
 try:
     # for backwards compatibility (running on Testlio's site)
-    from testlio.log import EventLogger
+    from testlio.log import EventLogger, traced
+    from testlio.assertions import SoftAssertions
+    from testlio.deadline import Deadline
+    from testlio.elements import ElementCache, describe_element
+    from testlio.executor import DEFAULT_POOL_SIZE, PooledRemoteConnection
+    from testlio.geometry import ViewportGeometry
+    from testlio.lifecycle import SessionPipeline
+    from testlio.locators import ACCESSIBILITY_ID, LOCATOR_CACHE_FILE, NameLocatorCache, candidate_locators, encodes_name, name_xpath
+    from testlio.metrics import LatencyRecorder, instrument_driver
+    from testlio.pagesource import PAGE_SOURCES_DIR, PageSourceArchive
+    from testlio.screenshots import DEFAULT_QUEUE_DEPTH, SCREENSHOTS_DIR, ScreenshotQueue, ScreenshotStore
+    from testlio.waits import ConditionWait, WaitStats
+    from testlio.sessions import SessionPool
 except ImportError:
-    from log import EventLogger
-
-SCREENSHOTS_DIR = './screenshots'
-DEFAULT_WAIT_TIME = 20
+    from log import EventLogger, traced
+    from assertions import SoftAssertions
+    from deadline import Deadline
+    from elements import ElementCache, describe_element
+    from executor import DEFAULT_POOL_SIZE, PooledRemoteConnection
+    from geometry import ViewportGeometry
+    from lifecycle import SessionPipeline
+    from locators import ACCESSIBILITY_ID, LOCATOR_CACHE_FILE, NameLocatorCache, candidate_locators, encodes_name, name_xpath
+    from metrics import LatencyRecorder, instrument_driver
+    from pagesource import PAGE_SOURCES_DIR, PageSourceArchive
+    from screenshots import DEFAULT_QUEUE_DEPTH, SCREENSHOTS_DIR, ScreenshotQueue, ScreenshotStore
+    from waits import ConditionWait, WaitStats
+    from sessions import SessionPool
+
+# Copies of the soft assertion state for scripts written against earlier versions.
+# FAILURES_FOUND follows every failure, the others are written at teardown. The
+# environment is shared by the process, so they are unreliable when tests run
+# concurrently, e.g. on a DevicePool
 SOFT_ASSERTIONS_FAILURES = "SOFT_ASSERTIONS_FAILURES"
 HASHED_VALUES = "HASHED_VALUES"
 TIMEOUT_LIMIT = "TIMEOUT_LIMIT"
 FAILURES_FOUND = "FAILURES_FOUND"
+DEFAULT_WAIT_TIME = 20
 LIMIT_TIME_EXECUTION_MIN = 50
 
 
+def timed_wait(method):
+    """Record the time spent in a waiting method of TestlioAutomationTest"""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.command_metrics is None:
+            return method(self, *args, **kwargs)
+        with self.command_metrics.timer('framework.' + method.__name__):
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
 class TestlioAutomationTest(unittest.TestCase):
     log = None
     name = None
@@ -39,6 +79,47 @@ class TestlioAutomationTest(unittest.TestCase):
     IS_ANDROID = False
     capabilities = {}
     passed = False
+    uiautomator2 = False
+    learn_name_locators = True
+    locator_cache = None
+    cache_elements = True
+    element_cache = None
+    deadline = None
+    soft_assertions = None
+    device = None
+    # keep one Appium session per device across tests, resetting the app in between
+    reuse_session = os.getenv('REUSE_SESSION', '').lower() in ('1', 'true')
+    # 'restart' (terminate and activate the app) or 'clear' (reset app data)
+    session_reset = os.getenv('SESSION_RESET', 'restart')
+    # quit the finished session in the background while the next one is already being created
+    prefetch_session = os.getenv('PREFETCH_SESSION', '').lower() in ('1', 'true')
+    # whether another test follows on the device, DevicePool turns it off for the last tests
+    prefetch_next = True
+    executor = None
+    lifecycle_timings = None
+    # send commands over a pool of keep-alive connections and record their latency
+    pooled_executor = os.getenv('POOLED_EXECUTOR', '').lower() in ('1', 'true')
+    executor_pool_size = int(os.getenv('EXECUTOR_POOL_SIZE', DEFAULT_POOL_SIZE))
+    # time every driver command and the framework's own waits, summary is logged at teardown
+    instrument_commands = True
+    command_metrics = None
+    wait_stats = None
+    geometry = None
+    # directory for machine readable latency summaries, one json file per test
+    metrics_dir = os.getenv('METRICS_DIR')
+    # take screenshots on a worker thread, the test only waits when the queue is full
+    async_screenshots = os.getenv('ASYNC_SCREENSHOTS', '').lower() in ('1', 'true')
+    screenshot_queue_depth = int(os.getenv('SCREENSHOT_QUEUE_DEPTH', DEFAULT_QUEUE_DEPTH))
+    screenshot_queue = None
+    # keep identical screenshots once, named by content hash
+    store_screenshots = os.getenv('STORE_SCREENSHOTS', '').lower() in ('1', 'true')
+    screenshot_budget_mb = float(os.getenv('SCREENSHOT_BUDGET_MB', 0))
+    screenshot_thumbnail_width = int(os.getenv('SCREENSHOT_THUMBNAIL_WIDTH', 0))
+    screenshot_store = None
+    # log page sources as references to a gzipped, deduplicated archive
+    archive_page_sources = os.getenv('ARCHIVE_PAGE_SOURCES', '').lower() in ('1', 'true')
+    page_sources_dir = os.getenv('PAGE_SOURCES_DIR', PAGE_SOURCES_DIR)
+    page_source_archive = None
 
     def parse_test_script_dir_and_filename(self, filename):
         # used in each test script to get its own path
@@ -53,6 +134,8 @@ class TestlioAutomationTest(unittest.TestCase):
     def setUpClass(cls):
         platform = os.getenv('PLATFORM') or (
             'android' if os.getenv('ANDROID_HOME') else 'ios')
+        if cls.reuse_session:
+            return
         if platform == 'ios' and 'TESTDROID_SERVER_URL' in os.environ or 'VIRTUAL_ENV' in os.environ:
             cls.capabilities['platformName'] = os.getenv('PLATFORM') or (
                 'android' if os.getenv('ANDROID_HOME') else 'ios')
@@ -92,6 +175,9 @@ class TestlioAutomationTest(unittest.TestCase):
     def setup_method(self, method, caps=False):
         self.name = type(self).__name__ + '.' + method.__name__
 
+        # Capabilities are shared on the class, keep the changes of this test to itself
+        self.capabilities = dict(self.capabilities)
+
         if 'TESTDROID_SERVER_URL' in os.environ or 'VIRTUAL_ENV' in os.environ:
 
             try:
@@ -137,6 +223,11 @@ class TestlioAutomationTest(unittest.TestCase):
 
             executor = os.getenv('EXECUTOR')
 
+        # device assigned by a DevicePool overrides the one from the environment
+        if self.device:
+            executor = self.device['executor']
+            self.capabilities['udid'] = self.device['udid']
+
         # if you want to use an app that's already installed on the phone...
         if os.getenv('APP'):
             self.capabilities['app'] = os.getenv('APP')
@@ -178,12 +269,43 @@ class TestlioAutomationTest(unittest.TestCase):
 
         self.capabilities.update(caps) if caps else None
 
-        self.driver = webdriver.Remote(
-            desired_capabilities=self.capabilities,
-            command_executor=executor)
+        self.executor = executor
+        self.lifecycle_timings = {}
+        started = time()
+        if self.reuse_session:
+            self.driver = SessionPool.acquire(executor, self.capabilities, self.session_reset,
+                                              self._command_executor(executor))
+        else:
+            self.driver = SessionPipeline.take(executor, self.capabilities) if self.prefetch_session else None
+            self.lifecycle_timings['session_prefetched'] = bool(self.driver)
+            if not self.driver:
+                self.driver = webdriver.Remote(
+                    desired_capabilities=self.capabilities,
+                    command_executor=self._command_executor(executor))
+        self.lifecycle_timings['session_create'] = time() - started
+
+        self.command_metrics = LatencyRecorder()
+        self.wait_stats = WaitStats()
+        self.geometry = ViewportGeometry(self.driver)
+        if self.instrument_commands:
+            instrument_driver(self.driver, self.command_metrics)
+        if self.store_screenshots:
+            self.screenshot_store = ScreenshotStore.shared(SCREENSHOTS_DIR,
+                                                           int(self.screenshot_budget_mb * 1024 * 1024),
+                                                           self.screenshot_thumbnail_width)
+        if self.async_screenshots:
+            self.screenshot_queue = ScreenshotQueue(self._take_screenshot, self.screenshot_queue_depth)
+        if self.archive_page_sources:
+            self.page_source_archive = PageSourceArchive.shared(self.page_sources_dir)
+        if self._command_latency():
+            self._command_latency().clear()
 
         self.driver.implicitly_wait(self.default_implicit_wait)
 
+        self.element_cache = ElementCache() if self.cache_elements else None
+        if self.learn_name_locators:
+            self.locator_cache = NameLocatorCache.shared(os.getenv('LOCATOR_CACHE_FILE', LOCATOR_CACHE_FILE))
+
         if str(self.capabilities['platformName']).lower() == 'android':
             self.IS_ANDROID = True
             self.IS_IOS = False
@@ -191,13 +313,13 @@ class TestlioAutomationTest(unittest.TestCase):
             self.IS_ANDROID = False
             self.IS_IOS = True
 
+        self.soft_assertions = SoftAssertions(on_failure=self._on_soft_failure)
         os.environ[FAILURES_FOUND] = "false"
         os.environ[SOFT_ASSERTIONS_FAILURES] = ""
         os.environ[HASHED_VALUES] = ""
-        os.environ[TIMEOUT_LIMIT] = ""
         self.caps = self.capabilities
-        import time
-        os.environ[TIMEOUT_LIMIT] = str(int(round(time.time())))
+        self.deadline = Deadline(LIMIT_TIME_EXECUTION_MIN * 60)
+        os.environ[TIMEOUT_LIMIT] = str(int(round(time())))
 
         self.angel_driver = self.driver
         try:
@@ -221,20 +343,43 @@ class TestlioAutomationTest(unittest.TestCase):
 
         self.driver = seleniumdriver.Remote(
             desired_capabilities=self.capabilities,
-            command_executor=os.getenv('EXECUTOR'))
+            command_executor=self._command_executor(os.getenv('EXECUTOR')))
+
+        self.command_metrics = LatencyRecorder()
+        self.wait_stats = WaitStats()
+        self.geometry = ViewportGeometry(self.driver)
+        if self.instrument_commands:
+            instrument_driver(self.driver, self.command_metrics)
 
         self.driver.implicitly_wait(DEFAULT_WAIT_TIME)
+        self.element_cache = ElementCache() if self.cache_elements else None
+        self.soft_assertions = SoftAssertions(on_failure=self._on_soft_failure)
         self.caps = self.capabilities
+        self.deadline = Deadline(LIMIT_TIME_EXECUTION_MIN * 60)
 
     def teardown_method(self, method):
         # self.log({'event': {'type': 'stop'}})
-        self.event._event_data("ClockHolder STOP Mechanism - start tear down")
+        if self.screenshot_queue:
+            # screenshots still need the session
+            self.screenshot_queue.close()
+            for path in self.screenshot_queue.failed:
+                self.event._log_info(self.event._event_data("Failure during taking the screenshot", path))
+            self.screenshot_queue = None
+        if self.lifecycle_timings is not None:
+            if self.prefetch_session:
+                # quits and log flushes of earlier tests on the device, done in the background
+                self.lifecycle_timings['retired'] = SessionPipeline.take_timings(self.executor, self.capabilities)
+            self.event._log_info(self.event._event_data('lifecycle', self.lifecycle_timings))
+        if self.command_metrics:
+            self._report_latency()
         self.event.stop()
-        if self.driver:
+        if self.driver and self.prefetch_session and not self.reuse_session:
+            SessionPipeline.retire(self.name, self.driver, self.event, self.executor, self.capabilities)
+            if self.prefetch_next:
+                SessionPipeline.prefetch(self.executor, self.capabilities, self._command_executor(self.executor))
+        elif self.driver and not self.reuse_session:
             try:
-                self.event._event_data("ClockHolder STOP Mechanism - before driver quit")
                 self.driver.quit()
-                self.event._event_data("ClockHolder STOP Mechanism - after driver quit")
             except:
                 self.event._log_info(self.event._event_data("Failure during closing the driver"))
                 pass
@@ -244,22 +389,89 @@ class TestlioAutomationTest(unittest.TestCase):
         #     except:
         #         self.event._log_info(self.event._event_data("Failure during closing the angel driver"))
         #         pass
-        self.event._event_data("ClockHolder STOP Mechanism - before Batch final assertion")
-        if os.environ[FAILURES_FOUND] == "true" and self.passed:
+        failures = None
+        if self.soft_assertions:
+            self._publish_soft_assertions()
+        if self.soft_assertions and self.soft_assertions.failed and self.passed:
+            failures = self.soft_assertions.summary()
+            self.soft_assertions.clear()
             os.environ[FAILURES_FOUND] = "false"
             self.event._log_info(
-                self.event._event_data("Soft failures found. Failures are: " + os.environ[SOFT_ASSERTIONS_FAILURES]))
-            self.fail(msg="Soft failures found. Failures are: " + os.environ[SOFT_ASSERTIONS_FAILURES])
+                self.event._event_data("Soft failures found. Failures are: " + failures))
+        self.event.close()
+        if failures:
+            self.fail(msg="Soft failures found. Failures are: " + failures)
+
+    def _on_soft_failure(self):
+        self.event.sync()
+        if self.soft_assertions.failed:
+            os.environ[FAILURES_FOUND] = "true"
+
+    def _publish_soft_assertions(self):
+        """All soft assertion state in os.environ, where scripts written for earlier versions read it"""
+
+        summary = self.soft_assertions.summary()
+        os.environ[SOFT_ASSERTIONS_FAILURES] = summary.encode('utf-8') if isinstance(summary, unicode) else summary
+        os.environ[FAILURES_FOUND] = "true" if self.soft_assertions.failed else "false"
+        os.environ[HASHED_VALUES] = self.soft_assertions.batch_hashes()
+
+    def _command_executor(self, executor):
+        """Pooled keep-alive connection to the executor if enabled, otherwise its url"""
+
+        if self.pooled_executor:
+            return PooledRemoteConnection(executor, pool_size=self.executor_pool_size)
+        return executor
+
+    def _report_latency(self):
+        """Log count, p50, p95 and max latency of every command and framework wait"""
+
+        latency = {'commands': self.command_metrics.summary()}
+        if self.wait_stats:
+            latency['waits'] = self.wait_stats.summary()
+        if self._command_latency():
+            latency['round_trips'] = self._command_latency().summary()
+        self.event.latency(latency)
+
+        if self.metrics_dir:
+            try:
+                if not os.path.exists(self.metrics_dir):
+                    os.makedirs(self.metrics_dir)
+                with open(os.path.join(self.metrics_dir, self.name + '.json'), 'w') as metrics_file:
+                    json.dump(latency, metrics_file, indent=2, sort_keys=True)
+            except (IOError, OSError):
+                pass
+
+    def _sleep(self, seconds):
+        """sleep that is accounted as a framework wait"""
+
+        if self.command_metrics is None:
+            return sleep(seconds)
+        with self.command_metrics.timer('framework.sleep'):
+            sleep(seconds)
+
+    def _command_latency(self):
+        """Per command latencies recorded by the pooled executor, None if not used"""
+
+        return getattr(self.driver.command_executor, 'latency', None) if self.driver else None
 
     def __stop_execution_on_timeout(self):
-        self.event._event_data("ClockHolder STOP Mechanism - method start")
-        import time
-        current_time = int(round(time.time()))
-        if current_time - int(os.getenv(TIMEOUT_LIMIT)) > LIMIT_TIME_EXECUTION_MIN * 60:
-            self.event._event_data("ClockHolder STOP Mechanism - before assertion")
+        if self.deadline and self.deadline.expired():
             self.fail(msg="Time execution of single tests exceeded {0} min.".format(
                 str(LIMIT_TIME_EXECUTION_MIN)))
 
+    def _wait(self, timeout, ignored_exceptions=None, name='wait'):
+        """Condition wait with adaptive polling, clamped to the test deadline"""
+
+        return ConditionWait(self.driver, timeout, ignored_exceptions,
+                             deadline=self.deadline, stats=self.wait_stats, name=name)
+
+    def _wait_timeout(self, timeout):
+        """Clamp a wait timeout to what is left of the test execution time limit"""
+
+        return self.deadline.clamp(timeout) if self.deadline else timeout
+
+    @traced('find')
+    @timed_wait
     def get_clickable_element(self, **kwargs):
         # self.dismiss_update_popup()
         self.__stop_execution_on_timeout()
@@ -268,14 +480,13 @@ class TestlioAutomationTest(unittest.TestCase):
             timeout = kwargs['timeout']
         else:
             timeout = 10
-        wait = WebDriverWait(self.driver, timeout, poll_frequency=0.5,
-                             ignored_exceptions=[ElementNotVisibleException, ElementNotSelectableException,
-                                                 StaleElementReferenceException, TimeoutException])
+        wait = self._wait(timeout, name='get_clickable_element',
+                          ignored_exceptions=[ElementNotVisibleException, ElementNotSelectableException,
+                                              StaleElementReferenceException, TimeoutException])
         try:
             if kwargs.has_key('name'):
-                return wait.until(EC.element_to_be_clickable((By.XPATH,
-                                                              '//*[contains(translate(@text,"ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"),"{0}") or contains(translate(@content-desc,"ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"),"{0}")]'.format(
-                                                                  str(kwargs['name']).lower()))))
+                return self._find_by_name(wait, kwargs['name'],
+                                          lambda element: element.is_displayed() and element.is_enabled())
             elif kwargs.has_key('class_name'):
                 return wait.until(EC.element_to_be_clickable((By.CLASS_NAME, kwargs['class_name'])))
             elif kwargs.has_key('id'):
@@ -289,36 +500,49 @@ class TestlioAutomationTest(unittest.TestCase):
         except:
             return False
 
+    @traced('find')
+    @timed_wait
     def get_element(self, **kwargs):
         # self.dismiss_update_popup()
         # self.run_phantom_driver_click('Search')
+        if kwargs.has_key('any_of'):
+            return self.find_any(kwargs['any_of'], kwargs.get('timeout', 10))[0]
+
         self.__stop_execution_on_timeout()
+        cached, screen = self._cached_element(kwargs) if kwargs.pop('use_cache', True) else (None, None)
+        if cached:
+            return cached
+
         self.set_implicit_wait(1)
         if kwargs.has_key('timeout'):
             timeout = kwargs['timeout']
         else:
             timeout = 10
-        wait = WebDriverWait(self.driver, timeout, poll_frequency=0.5,
-                             ignored_exceptions=[ElementNotVisibleException, ElementNotSelectableException,
-                                                 StaleElementReferenceException, TimeoutException, WebDriverException])
+        wait = self._wait(timeout, name='get_element',
+                          ignored_exceptions=[ElementNotVisibleException, ElementNotSelectableException,
+                                              StaleElementReferenceException, TimeoutException, WebDriverException])
         try:
             if kwargs.has_key('name'):
-                return wait.until(EC.presence_of_element_located((By.XPATH,
-                                                                  '//*[contains(translate(@text,"ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"),"{0}") or contains(translate(@content-desc,"ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"),"{0}")]'.format(
-                                                                      str(kwargs['name']).lower()))))
+                found = self._find_by_name(wait, kwargs['name'])
             elif kwargs.has_key('class_name'):
-                return wait.until(EC.presence_of_element_located((By.CLASS_NAME, kwargs['class_name'])))
+                found = wait.until(EC.presence_of_element_located((By.CLASS_NAME, kwargs['class_name'])))
             elif kwargs.has_key('id'):
-                return wait.until(EC.presence_of_element_located((By.ID, kwargs['id'])))
+                found = wait.until(EC.presence_of_element_located((By.ID, kwargs['id'])))
             elif kwargs.has_key('accessibility_id'):
-                return wait.until(EC.presence_of_element_located((By.ACCESSIBILITY_ID, kwargs['accessibility_id'])))
+                found = wait.until(EC.presence_of_element_located((ACCESSIBILITY_ID, kwargs['accessibility_id'])))
             elif kwargs.has_key('xpath'):
-                return wait.until(EC.presence_of_element_located((By.XPATH, kwargs['xpath'])))
+                found = wait.until(EC.presence_of_element_located((By.XPATH, kwargs['xpath'])))
             else:
                 raise TypeError('Element is not found')
         except:
             return False
 
+        if screen is not None:
+            self.element_cache.put(kwargs, found, screen)
+        return found
+
+    @traced('find')
+    @timed_wait
     def get_visible_element(self, **kwargs):
         # self.dismiss_update_popup()
         self.__stop_execution_on_timeout()
@@ -327,14 +551,12 @@ class TestlioAutomationTest(unittest.TestCase):
             timeout = kwargs['timeout']
         else:
             timeout = 10
-        wait = WebDriverWait(self.driver, timeout, poll_frequency=0.5,
-                             ignored_exceptions=[ElementNotVisibleException, ElementNotSelectableException,
-                                                 StaleElementReferenceException, TimeoutException, WebDriverException])
+        wait = self._wait(timeout, name='get_visible_element',
+                          ignored_exceptions=[ElementNotVisibleException, ElementNotSelectableException,
+                                              StaleElementReferenceException, TimeoutException, WebDriverException])
         try:
             if kwargs.has_key('name'):
-                return wait.until(EC.visibility_of_element_located((By.XPATH,
-                                                                    '//*[contains(translate(@text,"ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"),"{0}") or contains(translate(@content-desc,"ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"),"{0}")]'.format(
-                                                                        str(kwargs['name']).lower()))))
+                return self._find_by_name(wait, kwargs['name'], lambda element: element.is_displayed())
             elif kwargs.has_key('class_name'):
                 return wait.until(EC.visibility_of_element_located((By.CLASS_NAME, kwargs['class_name'])))
             elif kwargs.has_key('id'):
@@ -348,6 +570,8 @@ class TestlioAutomationTest(unittest.TestCase):
         except:
             return False
 
+    @traced('find')
+    @timed_wait
     def get_elements(self, **kwargs):
         # self.dismiss_update_popup()
         self.__stop_execution_on_timeout()
@@ -356,14 +580,13 @@ class TestlioAutomationTest(unittest.TestCase):
             timeout = kwargs['timeout']
         else:
             timeout = 10
-        wait = WebDriverWait(self.driver, timeout, poll_frequency=0.5,
-                             ignored_exceptions=[ElementNotVisibleException, ElementNotSelectableException,
-                                                 StaleElementReferenceException, TimeoutException, WebDriverException])
+        wait = self._wait(timeout, name='get_elements',
+                          ignored_exceptions=[ElementNotVisibleException, ElementNotSelectableException,
+                                              StaleElementReferenceException, TimeoutException, WebDriverException])
         try:
             if kwargs.has_key('name'):
-                return wait.until(EC.presence_of_all_elements_located((By.XPATH,
-                                                                       '//*[contains(translate(@text,"ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"),"{0}") or contains(translate(@content-desc,"ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"),"{0}")]'.format(
-                                                                           str(kwargs['name']).lower()))))
+                # a learnt locator can't promise to find all elements containing the name
+                return wait.until(EC.presence_of_all_elements_located((By.XPATH, name_xpath(kwargs['name']))))
             elif kwargs.has_key('class_name'):
                 return wait.until(EC.presence_of_all_elements_located((By.CLASS_NAME, kwargs['class_name'])))
             elif kwargs.has_key('id'):
@@ -377,27 +600,164 @@ class TestlioAutomationTest(unittest.TestCase):
         except:
             return []
 
+    @traced('find')
+    @timed_wait
+    def find_any(self, locators, timeout=10):
+        """
+        Wait for the first of several alternative locators to match, e.g.
+        [{'id': key}, {'accessibility_id': key}]. All of them are tried in every poll
+        within a single timeout.
+        Return: (element, matching locator) or (False, None)
+        """
+        self.__stop_execution_on_timeout()
+        candidates = [(locator, self._by(locator)) for locator in locators]
+
+        def first_match(driver):
+            for locator, by in candidates:
+                found = driver.find_elements(*by)
+                if found:
+                    return found[0], locator
+            return False
+
+        # don't let a locator that doesn't match hold up the others
+        self.set_implicit_wait(0)
+        try:
+            element, locator = self._wait(timeout, name='find_any',
+                                          ignored_exceptions=[StaleElementReferenceException,
+                                                              WebDriverException]).until(first_match)
+        except TimeoutException:
+            return False, None
+        finally:
+            self.set_implicit_wait(1)
+
+        return element, locator
+
+    def _by(self, locator):
+        """(By, value) pair for locator kwargs"""
+
+        if locator.has_key('name'):
+            return By.XPATH, name_xpath(locator['name'])
+        elif locator.has_key('class_name'):
+            return By.CLASS_NAME, locator['class_name']
+        elif locator.has_key('id'):
+            return By.ID, locator['id']
+        elif locator.has_key('accessibility_id'):
+            return ACCESSIBILITY_ID, locator['accessibility_id']
+        elif locator.has_key('xpath'):
+            return By.XPATH, locator['xpath']
+        else:
+            raise TypeError('Unsupported locator {0}'.format(locator))
+
+    def _name_locators(self, name):
+        """
+        Locators to look up an element by name, a cheaper one learnt earlier for this
+        name, screen and app version first, and the cache key to learn one under
+        """
+
+        xpath = (By.XPATH, name_xpath(name))
+        if not self.locator_cache:
+            return [xpath], None
+
+        screen = self._current_screen()
+        key = self.locator_cache.key(self._app_version(), screen, 'element', name)
+        learnt = self.locator_cache.get(key)
+        if learnt and not encodes_name(learnt, name):
+            self.locator_cache.discard(key)
+            learnt = None
+        return ([learnt, xpath] if learnt else [xpath]), key
+
+    def _find_by_name(self, wait, name, accept=None):
+        """
+        Wait for an element whose text or content-desc contains name and that accept
+        (e.g. is_displayed) holds for. Learnt locators only match elements whose text
+        or content-desc contains the name, so their hits need no check, when one finds
+        nothing the name xpath is tried in the same poll.
+        """
+
+        locators, key = self._name_locators(name)
+
+        def first_match(driver):
+            for locator in locators:
+                found = [element for element in driver.find_elements(*locator) if not accept or accept(element)]
+                if found:
+                    return locator, found[0]
+            return False
+
+        # don't let a learnt locator that doesn't match hold up the name xpath
+        self.set_implicit_wait(0)
+        try:
+            locator, found = wait.until(first_match)
+        finally:
+            self.set_implicit_wait(1)
+
+        if key and locator == locators[-1]:
+            self._learn_name_locator(key, name, found)
+        return found
+
+    def _learn_name_locator(self, key, name, element):
+        """
+        Remember the cheapest locator that finds the same element the slow name
+        lookup did, or forget the stale one when there is none
+        """
+
+        for locator in candidate_locators(element, name):
+            try:
+                found = self.driver.find_elements(*locator)
+            except:
+                continue
+            if found and found[0].id == element.id:
+                self.locator_cache.put(key, locator)
+                return
+        self.locator_cache.discard(key)
+
+    def _cached_element(self, kwargs):
+        """
+        Element cached for the id or accessibility id in kwargs and the current
+        screen, the screen is None when the lookup can't be cached
+        """
+
+        if not self.element_cache or not ElementCache.key(kwargs):
+            return None, None
+        screen = self._current_screen()
+        return self.element_cache.get(kwargs, screen), screen
+
+    def _current_screen(self):
+        """Identifier of the screen currently shown, where the platform offers a cheap one"""
+
+        if self.IS_ANDROID:
+            try:
+                return self.driver.current_activity
+            except:
+                pass
+        return None
+
+    def _app_version(self):
+        return os.getenv('APP_VERSION') or self.capabilities.get('app') or self.capabilities.get('appPackage')
+
     def is_element_on_screen_area(self, element):
         if element:
-            element_x = element.location['x']
-            element_y = element.location['y']
+            return self.geometry.is_on_screen(element)
 
-            element_w = element.size['width']
-            element_h = element.size['height']
+        return False
 
-            display_w = self.driver.get_window_size()['width']
-            display_h = self.driver.get_window_size()['height']
+    def filter_on_screen(self, elements):
+        """Elements, e.g. from get_elements, that lie completely within the screen"""
 
-            return (element_x > 0 and ((element_x + element_w) <= display_w)) and (
-                    element_y > 0 and ((element_y + element_h) <= display_h))
+        return self.geometry.filter_on_screen(elements)
 
-        return False
+    def set_orientation(self, orientation):
+        """Rotate the device to 'LANDSCAPE' or 'PORTRAIT'"""
+
+        self.geometry.set_orientation(orientation)
+        if self.element_cache:
+            self.element_cache.clear()
 
     def is_element_visible(self, element):
         self.__stop_execution_on_timeout()
         if element:
             if self.IS_IOS:
-                return (element.location['x'] > 0 or element.location['y'] > 0) and element.is_displayed()
+                rect = self.geometry.rect(element)
+                return (rect['x'] > 0 or rect['y'] > 0) and element.is_displayed()
             else:
                 return element.is_displayed()
         return False
@@ -406,6 +766,8 @@ class TestlioAutomationTest(unittest.TestCase):
         try:
             if "update your os" in str(self.driver.page_source).lower():
                 self.driver.back()
+                if self.element_cache:
+                    self.element_cache.clear()
         except:
             pass
 
@@ -416,44 +778,70 @@ class TestlioAutomationTest(unittest.TestCase):
         self.__stop_execution_on_timeout()
         if wait_time == -1:
             wait_time = self.default_implicit_wait
+        wait_time = self._wait_timeout(wait_time)
 
         try:
             self.driver.implicitly_wait(wait_time)
         except:
             pass
 
+    @traced('screenshot')
     def screenshot(self):
+        """
+        Take a screenshot, returns its path. With async_screenshots the path is
+        returned right away and the screenshot is written by a worker thread
+        """
+
         import time
+        platform = str(self.capabilities['platformName']).lower()
+        if platform not in ('ios', 'android'):
+            self.__stop_execution_on_timeout()
+            return None
+
+        if (platform == 'android' or self.screenshot_store) and not os.path.exists(SCREENSHOTS_DIR):
+            os.makedirs(SCREENSHOTS_DIR)
+
+        path = "{dir}/{name}-{time}.png".format(dir=SCREENSHOTS_DIR, name=self.name,
+                                                time=time.mktime(time.gmtime()))
+
+        if self.screenshot_queue:
+            return self.screenshot_queue.put(path)
+        return self._take_screenshot(path)
+
+    def _take_screenshot(self, path):
+        """Capture the screenshot and move it into the screenshot store if used"""
+
+        captured = self._capture_screenshot(path)
+        if not captured or not self.screenshot_store:
+            return captured
+
+        stored = self.screenshot_store.add(captured)
+        if self.screenshot_queue:
+            # events logged meanwhile reference the path handed out by screenshot()
+            self.event.stored_screenshot(path, stored)
+        return stored
+
+    def _capture_screenshot(self, path):
         import subprocess
         if str(self.capabilities['platformName']).lower() == 'ios':
-            time.sleep(1)  # wait for animations to complete before taking a screenshot
+            self._sleep(1)  # wait for animations to complete before taking a screenshot
 
             try:
-                path = "{dir}/{name}-{time}.png".format(dir=SCREENSHOTS_DIR, name=self.name,
-                                                        time=time.mktime(time.gmtime()))
-
-                if not os.environ['IOS_UDID'] and not os.environ['UDID']:
+                # the device a DevicePool assigned, not the one of the environment
+                udid = self.capabilities.get('udid') if self.device else None
+                udid = udid or os.getenv('IOS_UDID') or os.getenv('UDID')
+                if not udid:
                     raise Exception('screenshot failed. IOS_UDID not provided')
 
-                if os.environ['IOS_UDID']:
-                    subprocess.call("echo $IOS_UDID &> consoleoutput.txt", shell=True)
-                    subprocess.call("idevicescreenshot -u $IOS_UDID \"" + path + "\" &> consoleoutput2.txt", shell=True)
-                else:
-                    subprocess.call("echo $UDID &> consoleoutput.txt", shell=True)
-                    subprocess.call("idevicescreenshot -u $UDID \"" + path + "\" &> consoleoutput2.txt", shell=True)
+                subprocess.call("echo " + udid + " &> consoleoutput.txt", shell=True)
+                subprocess.call("idevicescreenshot -u " + udid + " \"" + path + "\" &> consoleoutput2.txt", shell=True)
 
                 return path
             except:
                 return False
-        elif str(self.capabilities['platformName']).lower() == 'android':
-            time.sleep(1)  # wait for animations to complete before taking a screenshot
-
-            if not os.path.exists(SCREENSHOTS_DIR):
-                os.makedirs(SCREENSHOTS_DIR)
+        else:
+            self._sleep(1)  # wait for animations to complete before taking a screenshot
 
-            path = "{dir}/{name}-{time}.png".format(
-                dir=SCREENSHOTS_DIR, name=self.name, time=time.mktime(time.gmtime())
-            )
             try:
                 if self.driver.save_screenshot(path) and (os.stat(path).st_size / 1024) > 100:
                     print 'Try to take the screenshot'
@@ -463,11 +851,11 @@ class TestlioAutomationTest(unittest.TestCase):
                     print 'Re-try to take the screenshot'
                     return path
             except:
-                subprocess.call("adb shell screencap -p | perl -pe 's/\x0D\x0A/\x0A/g' > " + path, shell=True)
+                adb = "adb -s " + self.capabilities['udid'] if self.capabilities.get('udid') else "adb"
+                subprocess.call(adb + " shell screencap -p | perl -pe 's/\x0D\x0A/\x0A/g' > " + path, shell=True)
                 return path
 
-        self.__stop_execution_on_timeout()
-
+    @traced('validate_tcp')
     def validate_tcp(self, host, from_timestamp=None, to_timestamp=None, uri_contains=None,
                      body_contains=None, screenshot=None, request_present=None):
         """Save TCP validation data for post processing"""
@@ -476,41 +864,33 @@ class TestlioAutomationTest(unittest.TestCase):
         self.event.validate_tcp(host, from_timestamp, to_timestamp, uri_contains,
                                 body_contains, screenshot, request_present)
 
+    @traced('click')
     def click(self, element=None, screenshot=False, **kwargs):
         """
         Perform click on element. If element is not provided try to search
         by paramaters in kwargs.
         """
         self.run_phantom_driver_click('Search')
-        sleep(2)
+        self._sleep(2)
 
         def _click(element):
             try:
+                # the readable name costs round trips, only fetch it when the click gets logged
+                sampled = self.event.sample('click')
                 if element:
-                    try:
-                        if self.uiautomator2:
-                            readable_name = element.text or \
-                                            element.get_attribute('name') or \
-                                            element.get_attribute('resourceId') or \
-                                            element.get_attribute('contentDescription') or \
-                                            element.get_attribute('value') or \
-                                            element.tag_name
-                        else:
-                            readable_name = element.text or \
-                                            element.get_attribute('name') or \
-                                            element.get_attribute('resource-id') or \
-                                            element.get_attribute('content-desc') or \
-                                            element.get_attribute('value') or \
-                                            element.tag_name
-                        kwargs['Element'] = str(readable_name).replace(": u'", ": '")
-                    except:
-                        pass
+                    if sampled:
+                        try:
+                            readable_name = describe_element(element, self.uiautomator2,
+                                                             web=bool(self.capabilities.get('browserName')))
+                            kwargs['Element'] = str(readable_name).replace(": u'", ": '")
+                        except:
+                            pass
                     element.click()
                 else:
                     # self.event._log_info(self.event._event_data("*** WARNING ***  Element is absent"))
                     self.event.error()
                 screenshot_path = self.screenshot() if screenshot else None
-                self.event.click(screenshot=screenshot_path,
+                self.event.click(screenshot=screenshot_path, sampled=sampled,
                                  **self._format_element_data(**kwargs))
             except:
                 self.event.error()
@@ -520,6 +900,7 @@ class TestlioAutomationTest(unittest.TestCase):
 
         return self._element_action(_click, element, **kwargs)
 
+    @traced('send_keys')
     def send_keys(self, data, element=None, screenshot=False, **kwargs):
         """
         Send keys to an element. If element is not provided try to search
@@ -540,6 +921,7 @@ class TestlioAutomationTest(unittest.TestCase):
 
         return self._element_action(_send_keys, element, **kwargs)
 
+    @traced('send_text')
     def send_text(self, data, element=None, screenshot=False, **kwargs):
         """
         Set text to an element. If element is not provided try to search
@@ -564,6 +946,7 @@ class TestlioAutomationTest(unittest.TestCase):
 
         return self._element_action(_send_keys, element, **kwargs)
 
+    @traced('accept_alert')
     def wait_and_accept_alert(self, timeout=20):
         """Wait for alert and accept"""
 
@@ -577,6 +960,7 @@ class TestlioAutomationTest(unittest.TestCase):
 
         self._alert_action(timeout, accept_alert)
 
+    @traced('dismiss_alert')
     def wait_and_dismiss_alert(self, timeout=20):
         """Wait for alert and dismiss"""
 
@@ -618,6 +1002,7 @@ class TestlioAutomationTest(unittest.TestCase):
         else:
             self.assertTrue(condition, msg)
 
+    @traced('exists')
     def exists(self, **kwargs):
         """
         Finds element by name or xpath
@@ -625,6 +1010,8 @@ class TestlioAutomationTest(unittest.TestCase):
             call using an element:
             my_layout = self.get_element(class_name='android.widget.LinearLayout')
             self.exists(name='Submit', driver=my_layout)
+            accept the first of alternative locators, tried within one timeout:
+            self.exists(any_of=[{'id': 'submit'}, {'accessibility_id': 'Submit'}], timeout=7)
         """
         self.__stop_execution_on_timeout()
         self.run_phantom_driver_click('Search')
@@ -635,12 +1022,15 @@ class TestlioAutomationTest(unittest.TestCase):
                 return False
         else:
             try:
-                return self.get_element(**kwargs)
+                # cached elements may have changed since, e.g. been relabelled
+                return self.get_element(**dict(kwargs, use_cache=False))
             except NoSuchElementException:
                 return False
                 # finally:
                 #     self.driver.implicitly_wait(self.default_implicit_wait)
 
+    @traced('not_exists')
+    @timed_wait
     def not_exists(self, **kwargs):
         """
         Waits until element does not exist.  Waits up to <implicit_wait> seconds.
@@ -653,16 +1043,11 @@ class TestlioAutomationTest(unittest.TestCase):
         else:
             timeout = 30
 
-        start_time = time()
-
         kwargs['timeout'] = 0  # we want exists to return immediately
-        while True:
-            elem = self.exists(**kwargs)
-            if not elem:
-                return True
-
-            if time() - start_time > timeout:
-                return False
+        try:
+            return self._wait(timeout, name='not_exists').until(lambda driver: not self.exists(**kwargs))
+        except TimeoutException:
+            return False
 
     """
     The method works only with (name|value) and (text|content-desc) attributes
@@ -675,6 +1060,7 @@ class TestlioAutomationTest(unittest.TestCase):
      - with_timeout - set the timeout before the getting of the page source
     """
 
+    @traced('verify_in_batch')
     def verify_in_batch(self, data, case_sensitive=True, strict_visibility=True, screenshot=True, strict=False,
                         with_timeout=2):
         self.__stop_execution_on_timeout()
@@ -684,28 +1070,28 @@ class TestlioAutomationTest(unittest.TestCase):
 
         if 'iPad' in self.capabilities['deviceName']:
             if strict:
-                sleep(with_timeout)
+                self._sleep(with_timeout)
                 if type(data) is list:
                     for key in data:
                         self.assertTrueWithScreenShot(
-                            self.exists(id=key, timeout=7) or self.exists(accessibility_id=key, timeout=7),
+                            self.exists(any_of=[{'id': key}, {'accessibility_id': key}], timeout=7),
                             screenshot=False,
                             msg="Element '%s' is expected to be existed on the page" % key)
                 else:
-                    self.assertTrueWithScreenShot(self.exists(id=data) or self.exists(accessibility_id=data),
+                    self.assertTrueWithScreenShot(self.exists(any_of=[{'id': data}, {'accessibility_id': data}]),
                                                   screenshot=False,
                                                   msg="Element '%s' is expected to be existed on the page" % data)
             else:
                 if type(data) is list:
-                    if self.__perform_hash_validations(data):
-                        sleep(with_timeout)
+                    if self.soft_assertions.first_batch(data):
+                        self._sleep(with_timeout)
                         self._validate_batch(data, strict, strict_visibility)
 
                 else:
-                    if not (self.exists(id=data, timeout=7) or self.exists(accessibility_id=data, timeout=7)):
+                    if not self.exists(any_of=[{'id': data}, {'accessibility_id': data}], timeout=7):
                         self.__log_batch_error(data)
         else:
-            sleep(with_timeout)
+            self._sleep(with_timeout)
             self._validate_batch(data, strict, strict_visibility)
 
         self.event.assertion(data="*** BATCH VERIFICATION END ***")
@@ -731,7 +1117,7 @@ class TestlioAutomationTest(unittest.TestCase):
                     if not re.search(r'{0}'.format(pattern.format(key)), page_source, re.M | re.I):
                         error_flag = self.__log_batch_error(key)
                     else:
-                        self.event._log_info(self.event._event_data("*** SUCCESS *** Element is presented: '%s'" % key))
+                        self.event.success("Element is presented: '%s'", key)
         else:
             if strict:
                 self.assertTrueWithScreenShot(re.search(
@@ -741,38 +1127,20 @@ class TestlioAutomationTest(unittest.TestCase):
                 if not re.search(r'{0}'.format(pattern.format(data)), page_source, re.M | re.I):
                     error_flag = self.__log_batch_error(data)
                 else:
-                    self.event._log_info(self.event._event_data("*** SUCCESS *** Element is presented: '%s'" % data))
+                    self.event.success("Element is presented: '%s'", data)
 
         if error_flag:
             self._page_source_to_console_log(page_source)
 
-    def __perform_hash_validations(self, list):
-        val = hash(str(list))
-        hashlist = os.environ[HASHED_VALUES]
-
-        if str(val) not in hashlist:
-            hashlist += str(val) + ' '
-            os.environ[HASHED_VALUES] = hashlist
-            return True
-        else:
-            return False
-
     def __log_batch_error(self, data):
-        errors = os.environ[SOFT_ASSERTIONS_FAILURES]
         self.event.assertion(data="*** FAILURE *** Element is missing: '%s'" % data)
-        errors += "\nElement is missing: '%s'" % data
-        os.environ[SOFT_ASSERTIONS_FAILURES] = errors
-        os.environ[FAILURES_FOUND] = "true"
+        self.soft_assertions.add("Element is missing: '%s'" % data, selector=data)
         return True
 
     def exists_in_page_source(self, data):
         if data not in self.driver.page_source:
-            errors = os.environ[SOFT_ASSERTIONS_FAILURES]
-
             self.event.assertion(data="*** FAILURE *** Element is missing: '%s'" % data)
-
-            errors += "\nElement is missing: '%s'" % data
-            os.environ[SOFT_ASSERTIONS_FAILURES] = errors
+            self.soft_assertions.add("Element is missing: '%s'" % data, selector=data, fails_test=False)
 
     def verify_exists(self, strict=False, **kwargs):
         screenshot = False
@@ -801,22 +1169,14 @@ class TestlioAutomationTest(unittest.TestCase):
                                           msg="Should see element with text or selector: '%s'" % selector)
         else:
             if not self.exists(**kwargs):
-                errors = os.environ[SOFT_ASSERTIONS_FAILURES]
-
+                screenshot_path = self.screenshot()
                 self.event.assertion(data="*** FAILURE *** Element is missing: '%s'" % selector,
-                                     screenshot=self.screenshot())
-
-                errors += "\nElement is missing: '%s'" % selector
-                try:
-                    errors = errors.encode('utf-8')
-                except:
-                    errors = errors.encode('ascii', 'ignore').decode('ascii')
-
-                os.environ[SOFT_ASSERTIONS_FAILURES] = errors
-                os.environ[FAILURES_FOUND] = "true"
+                                     screenshot=screenshot_path)
+                self.soft_assertions.add("Element is missing: '%s'" % selector, selector=selector,
+                                         screenshot=screenshot_path)
                 self._page_source_to_console_log()
             else:
-                self.event._log_info(self.event._event_data("*** SUCCESS *** Element is presented: '%s'" % selector))
+                self.event.success("Element is presented: '%s'", selector)
 
     def verify_not_exists(self, strict=False, **kwargs):
         screenshot = False
@@ -843,19 +1203,14 @@ class TestlioAutomationTest(unittest.TestCase):
                                           msg="Should NOT see element with text or selector: '%s'" % selector)
         else:
             if self.exists(**kwargs):
-                errors = os.environ[SOFT_ASSERTIONS_FAILURES]
+                screenshot_path = self.screenshot()
                 self.event.assertion(data="*** FAILURE *** Element is presented but should not be: '%s'" % selector,
-                                     screenshot=self.screenshot())
-                errors += "\nElement is presented but should not be: '%s'" % selector
-                try:
-                    errors = errors.encode('utf-8')
-                except:
-                    errors = errors.encode('ascii', 'ignore').decode('ascii')
-                os.environ[SOFT_ASSERTIONS_FAILURES] = errors
-                os.environ[FAILURES_FOUND] = "true"
+                                     screenshot=screenshot_path)
+                self.soft_assertions.add("Element is presented but should not be: '%s'" % selector,
+                                         selector=selector, screenshot=screenshot_path)
                 self._page_source_to_console_log()
             else:
-                self.event._log_info(self.event._event_data("*** SUCCESS *** Element missing: '%s'" % selector))
+                self.event.success("Element missing: '%s'", selector)
 
     def verify_not_equal(self, obj1, obj2, screenshot=False):
         self.assertTrueWithScreenShot(obj1 != obj2, screenshot=screenshot,
@@ -877,26 +1232,35 @@ class TestlioAutomationTest(unittest.TestCase):
         Finds element by name or xpath
         """
 
+        cached, screen = self._cached_element(kwargs)
+        if cached:
+            return cached
+
         if kwargs.has_key('timeout'):
             self.set_implicit_wait(int(kwargs['timeout']))
 
         if kwargs.has_key('name'):
-            return self._find_element_by_xpath(
+            element = self._find_element_by_xpath(
                 '//*[@text="{0}" or @content-desc="{1}"]'.format(kwargs['name'], kwargs['name']))
         elif kwargs.has_key('class_name'):
-            return self._find_element_by_class_name(kwargs['class_name'])
+            element = self._find_element_by_class_name(kwargs['class_name'])
         elif kwargs.has_key('id'):
-            return self._find_element_by_id(kwargs['id'])
+            element = self._find_element_by_id(kwargs['id'])
         elif kwargs.has_key('accessibility_id'):
-            return self._find_element_by_accessibility_id(kwargs['accessibility_id'])
+            element = self._find_element_by_accessibility_id(kwargs['accessibility_id'])
         elif kwargs.has_key('xpath'):
-            return self._find_element_by_xpath(kwargs['xpath'])
+            element = self._find_element_by_xpath(kwargs['xpath'])
         elif kwargs.has_key('element'):
             return kwargs['element']
         else:
             self.assertTrueWithScreenShot(False,
                                           msg="The element with provided args '{0}' was not found".format(str(kwargs)),
                                           screenshot=True)
+            return
+
+        if screen is not None:
+            self.element_cache.put(kwargs, element, screen)
+        return element
 
     def _find_element_by_name(self, name):
         try:
@@ -948,18 +1312,18 @@ class TestlioAutomationTest(unittest.TestCase):
         except Exception, e:
             return False
 
+    @timed_wait
     def _alert_action(self, timeout, action):
         """Wait for alert and perform action"""
 
-        start_timestamp = datetime.utcnow()
-        while True:
-            if not self._alert_is_present():
-                sleep(1.0)
-                if datetime.utcnow() - start_timestamp > timedelta(seconds=timeout):
-                    raise NoSuchAlertException("Alert didn't appear in %s seconds" % timeout)
-                continue
-            action()
-            break
+        try:
+            self._wait(timeout, name='alert').until(lambda driver: self._alert_is_present())
+        except TimeoutException:
+            raise NoSuchAlertException("Alert didn't appear in %s seconds" % timeout)
+
+        action()
+        if self.element_cache:
+            self.element_cache.clear()
 
     def _format_element_data(self, **kwargs):
         """
@@ -991,8 +1355,11 @@ class TestlioAutomationTest(unittest.TestCase):
         else:
             try:
                 page_source = data if data is not None else self.driver.page_source
-                log = page_source.encode('utf-8')
-                self.event._log_to_console_log(str(log))
+                if self.page_source_archive:
+                    self.event._log_to_console_log(self.page_source_archive.add(page_source))
+                else:
+                    log = page_source.encode('utf-8')
+                    self.event._log_to_console_log(str(log))
             except:
                 self.event._log_to_console_log('Error while logging page source')
 
@@ -0,0 +1,27 @@
+import time
+
+# time.monotonic is not available on python 2, fall back to wall clock there
+_monotonic = getattr(time, 'monotonic', time.time)
+
+
+class Deadline(object):
+    """Execution time budget of a single test"""
+
+    def __init__(self, seconds):
+        super(Deadline, self).__init__()
+
+        self.seconds = seconds
+        self._end = _monotonic() + seconds
+
+    def remaining(self):
+        """Seconds left in the budget, never negative"""
+
+        return max(0, self._end - _monotonic())
+
+    def expired(self):
+        return _monotonic() >= self._end
+
+    def clamp(self, timeout):
+        """Shorten timeout so that it never runs past the deadline"""
+
+        return min(timeout, self.remaining())
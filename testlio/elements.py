@@ -0,0 +1,95 @@
+from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
+
+# Only these locators keep naming the same element while it is shown, what name,
+# class_name and xpath match changes with the element's text and attributes.
+# The latter come first in lookups, kwargs with them are never cached
+IDENTITY_KEYS = ('id', 'accessibility_id')
+LOOKUP_KEYS = ('name', 'class_name')
+
+# Attributes tried in order for a readable element name
+UIAUTOMATOR2_ATTRIBUTES = ('name', 'resourceId', 'contentDescription', 'value')
+ATTRIBUTES = ('name', 'resource-id', 'content-desc', 'value')
+
+# Same lookup in one round trip for web contexts
+DESCRIBE_SCRIPT = ("var e = arguments[0];"
+                   "return [e.innerText || e.textContent, e.getAttribute('name'), e.id,"
+                   " e.getAttribute('aria-label'), e.value, e.tagName];")
+
+
+class ElementCache(object):
+    """
+    Per test cache of elements found by id or accessibility id. Hits are only
+    served on the screen they were found on and after a single location read,
+    so a platform without a cheap screen identifier (screen is None) never gets
+    any
+    """
+
+    def __init__(self):
+        super(ElementCache, self).__init__()
+
+        self._elements = {}
+        self._screen = None
+
+    @staticmethod
+    def key(kwargs):
+        if any(name in kwargs for name in LOOKUP_KEYS):
+            return None
+        key = tuple((name, kwargs[name]) for name in IDENTITY_KEYS if name in kwargs)
+        return key or None
+
+    def get(self, kwargs, screen):
+        key = self.key(kwargs)
+        if key is None or not self._on_screen(screen):
+            return None
+        element = self._elements.get(key)
+        if element is None:
+            return None
+
+        try:
+            element.location
+            return element
+        except (StaleElementReferenceException, WebDriverException):
+            del self._elements[key]
+            return None
+
+    def put(self, kwargs, element, screen):
+        key = self.key(kwargs)
+        if key and element and self._on_screen(screen):
+            self._elements[key] = element
+
+    def _on_screen(self, screen):
+        """Drop all cached elements when the screen is different from the one seen last"""
+
+        if screen != self._screen:
+            self._elements.clear()
+            self._screen = screen
+        return screen is not None
+
+    def clear(self):
+        self._elements.clear()
+
+
+def describe_element(element, uiautomator2=False, web=False):
+    """
+    Readable name of an element for the event log: its text or the first non empty
+    identifying attribute. Web contexts fetch them all with a single script call,
+    native ones stop at the first non empty value.
+    """
+
+    if web:
+        try:
+            values = element.parent.execute_script(DESCRIBE_SCRIPT, element)
+            for value in values or []:
+                if value:
+                    return value
+        except WebDriverException:
+            pass
+
+    readable_name = element.text
+    if readable_name:
+        return readable_name
+    for attribute in (UIAUTOMATOR2_ATTRIBUTES if uiautomator2 else ATTRIBUTES):
+        readable_name = element.get_attribute(attribute)
+        if readable_name:
+            return readable_name
+    return element.tag_name
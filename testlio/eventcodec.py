@@ -0,0 +1,217 @@
+"""
+Compact event log encoding.
+
+A log is a sequence of records, each starting with its length as a 4 byte big
+endian integer and a kind byte:
+
+    S  string definition: id, utf-8 text (event types)
+    V  value definition: id, json (element dicts, they repeat a lot)
+    F  flat event: level, timestamp in microseconds since the epoch, ids of its
+       type and element, lengths of its data and screenshot, then the utf-8 data
+       and screenshot. One struct.pack covers everything but the two strings
+    J  any other event: level, timestamp, json
+
+Events EventLogger writes are almost all flat: an event type with an optional
+string as data, the element kwargs of the call and a screenshot path.
+"""
+
+import datetime
+import json
+import os
+import struct
+import sys
+
+EPOCH = datetime.datetime(1970, 1, 1)
+LEVELS = ('info', 'error')
+
+_LENGTH = struct.Struct('>I')
+# length, kind, id
+_DEFINITION = struct.Struct('>IcI')
+# length, kind, level, micros, type id, element id, data length, screenshot length.
+# Ids and lengths are -1 when the event has none
+_FLAT = struct.Struct('>IcBqiiii')
+# length, kind, level, micros
+_JSON = struct.Struct('>IcBq')
+
+_STRING_RECORD = b'S'
+_VALUE_RECORD = b'V'
+_FLAT_RECORD = b'F'
+_JSON_RECORD = b'J'
+
+_FLAT_KEYS = frozenset(['event', 'element', 'screenshot'])
+_FLAT_EVENT_KEYS = frozenset(['type', 'data'])
+
+
+def timestamp_micros(timestamp):
+    """Microseconds since the epoch of a naive UTC datetime"""
+
+    delta = timestamp - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _encoded(value):
+    """utf-8 bytes of a string, AttributeError for anything else"""
+
+    if type(value) is bytes:
+        return value
+    return value.encode('utf-8')
+
+
+class EventEncoder(object):
+    """Encodes events into records, remembering the strings and elements already defined"""
+
+    def __init__(self):
+        super(EventEncoder, self).__init__()
+
+        self._strings = {}
+        self._values = {}
+
+    def encode(self, data, timestamp, level='info'):
+        """Records (bytes) for one event, definitions come first"""
+
+        level = 0 if level == 'info' else LEVELS.index(level)
+        delta = timestamp - EPOCH
+        micros = (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+        if _FLAT_KEYS.issuperset(data):
+            try:
+                return self._flat(data, level, micros)
+            except (AttributeError, TypeError, ValueError):
+                # values that aren't strings, an element that can't be hashed
+                pass
+        # same fallback as logging the event through str()
+        body = json.dumps(data, default=str).encode('utf-8')
+        return _JSON.pack(_JSON.size - _LENGTH.size + len(body), _JSON_RECORD, level, micros) + body
+
+    def _flat(self, data, level, micros):
+        type_id = element_id = data_length = screenshot_length = -1
+        event_type = type_text = element_key = element_json = None
+        event_data = screenshot = b''
+
+        # everything that can fail comes before new definitions are registered
+        event = data.get('event')
+        if event is not None:
+            if not _FLAT_EVENT_KEYS.issuperset(event):
+                raise ValueError('not a flat event')
+            event_type = event['type']
+            type_id = self._strings.get(event_type)
+            if type_id is None:
+                type_text = _encoded(event_type)
+            if 'data' in event:
+                event_data = _encoded(event['data'])
+                data_length = len(event_data)
+
+        element = data.get('element')
+        if element is not None:
+            # equal kwargs from the same call site list their items in the same order
+            element_key = tuple(element.items())
+            element_id = self._values.get(element_key)
+            if element_id is None:
+                element_json = json.dumps(element).encode('utf-8')
+
+        if 'screenshot' in data:
+            screenshot = _encoded(data['screenshot'])
+            screenshot_length = len(screenshot)
+
+        definitions = b''
+        if event is not None and type_id is None:
+            definitions += self._definition(_STRING_RECORD, len(self._strings), type_text)
+            type_id = self._strings[event_type] = len(self._strings)
+        if element is not None and element_id is None:
+            definitions += self._definition(_VALUE_RECORD, len(self._values), element_json)
+            element_id = self._values[element_key] = len(self._values)
+
+        return definitions + _FLAT.pack(
+            _FLAT.size - _LENGTH.size + len(event_data) + len(screenshot), _FLAT_RECORD, level, micros,
+            type_id, element_id, data_length, screenshot_length) + event_data + screenshot
+
+    @staticmethod
+    def _definition(kind, definition_id, value):
+        return _DEFINITION.pack(_DEFINITION.size - _LENGTH.size + len(value), kind, definition_id) + value
+
+
+class CompactEventWriter(object):
+    """Appends encoded events to a file, string ids restart with every writer"""
+
+    def __init__(self, path):
+        super(CompactEventWriter, self).__init__()
+
+        self.path = path
+        self._encoder = EventEncoder()
+        self._file = open(path, 'ab')
+
+    def write(self, data, timestamp, level='info'):
+        self._file.write(self._encoder.encode(data, timestamp, level))
+
+    def flush(self):
+        self._file.flush()
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def read_events(stream):
+    """Yield (level, timestamp in microseconds, data) for every event in a binary stream"""
+
+    strings = {}
+    values = {}
+    while True:
+        header = stream.read(_LENGTH.size)
+        if len(header) < _LENGTH.size:
+            # End of log, a truncated last record is dropped
+            return
+        length = _LENGTH.unpack(header)[0]
+        record = header + stream.read(length)
+        if len(record) < _LENGTH.size + length:
+            return
+
+        kind = record[4:5]
+        if kind == _FLAT_RECORD:
+            _, _, level, micros, type_id, element_id, data_length, screenshot_length = _FLAT.unpack_from(record)
+            data = {}
+            if type_id >= 0:
+                data['event'] = {'type': strings[type_id]}
+                if data_length >= 0:
+                    data['event']['data'] = record[_FLAT.size:_FLAT.size + data_length].decode('utf-8')
+            if element_id >= 0:
+                data['element'] = dict(values[element_id])
+            if screenshot_length >= 0:
+                data['screenshot'] = record[len(record) - screenshot_length:].decode('utf-8')
+            yield LEVELS[level], micros, data
+        elif kind == _JSON_RECORD:
+            _, _, level, micros = _JSON.unpack_from(record)
+            yield LEVELS[level], micros, json.loads(record[_JSON.size:].decode('utf-8'))
+        elif kind == _STRING_RECORD:
+            strings[_DEFINITION.unpack_from(record)[2]] = record[_DEFINITION.size:].decode('utf-8')
+        elif kind == _VALUE_RECORD:
+            values[_DEFINITION.unpack_from(record)[2]] = json.loads(record[_DEFINITION.size:].decode('utf-8'))
+
+
+def to_json_lines(source, target):
+    """Convert a compact log into the JSON lines written by EventLogger"""
+
+    for _, micros, data in read_events(source):
+        data['timestamp'] = (EPOCH + datetime.timedelta(microseconds=micros)).isoformat()
+        target.write(json.dumps(data) + '\n')
+
+
+def main(args=None):
+    args = sys.argv[1:] if args is None else args
+    if len(args) not in (1, 2):
+        sys.stderr.write('usage: python -m testlio.eventcodec EVENTS_FILE [JSON_FILE]\n')
+        return 2
+
+    with open(args[0], 'rb') as source:
+        if len(args) == 2:
+            with open(args[1], 'w') as target:
+                to_json_lines(source, target)
+        else:
+            to_json_lines(source, sys.stdout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
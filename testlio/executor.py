@@ -0,0 +1,38 @@
+import time
+
+import urllib3
+
+try:
+    from appium.webdriver.appium_connection import AppiumConnection as _Connection
+except ImportError:
+    # older Appium clients use the plain Selenium connection
+    from selenium.webdriver.remote.remote_connection import RemoteConnection as _Connection
+
+try:
+    from testlio.metrics import LatencyRecorder
+except ImportError:
+    from metrics import LatencyRecorder
+
+DEFAULT_POOL_SIZE = 4
+
+
+class PooledRemoteConnection(_Connection):
+    """
+    Command executor for webdriver.Remote keeping a pool of persistent HTTP
+    connections to the executor and recording the round trip of every command
+    """
+
+    def __init__(self, remote_server_addr, pool_size=DEFAULT_POOL_SIZE, resolve_ip=True):
+        _Connection.__init__(self, remote_server_addr, keep_alive=True, resolve_ip=resolve_ip)
+
+        # Screenshots or logging may run commands from other threads, keep a
+        # connection for each of them instead of reconnecting
+        self._conn = urllib3.PoolManager(maxsize=pool_size, timeout=self._timeout)
+        self.latency = LatencyRecorder()
+
+    def execute(self, command, params):
+        started = time.time()
+        try:
+            return _Connection.execute(self, command, params)
+        finally:
+            self.latency.record(command, time.time() - started)
@@ -0,0 +1,78 @@
+from selenium.common.exceptions import UnknownMethodException, WebDriverException
+
+
+class ViewportGeometry(object):
+    """
+    Screen geometry of a session: the window size is cached per orientation and
+    element rectangles are read with a single call where the driver supports it
+    """
+
+    def __init__(self, driver):
+        super(ViewportGeometry, self).__init__()
+
+        self._driver = driver
+        self._window_sizes = {}
+        self._rect_supported = True
+        self._orientation_supported = True
+        self.orientation = None
+
+    def window_size(self):
+        """
+        Window size for the current orientation. The orientation is read on every
+        call, the app or driver.orientation may have rotated the device since
+        """
+
+        if self._orientation_supported:
+            try:
+                self.orientation = str(self._driver.orientation).upper()
+            except WebDriverException:
+                self._orientation_supported = False
+                self.orientation = None
+
+        if self.orientation is None:
+            # rotations can't be told apart without the orientation
+            return self._driver.get_window_size()
+        if self.orientation not in self._window_sizes:
+            self._window_sizes[self.orientation] = self._driver.get_window_size()
+        return self._window_sizes[self.orientation]
+
+    def set_orientation(self, orientation):
+        """Rotate the device, the window size of the new orientation is read once"""
+
+        self._driver.orientation = orientation
+        self.orientation = str(orientation).upper()
+
+    def rect(self, element):
+        """x, y, width and height of the element"""
+
+        if self._rect_supported:
+            try:
+                return element.rect
+            except WebDriverException as e:
+                # JSONWP drivers don't know the rect command, don't try again. Errors
+                # about the element itself (stale, ...) are subclasses
+                if not _unknown_command(e):
+                    raise
+                self._rect_supported = False
+
+        rect = dict(element.location)
+        rect.update(element.size)
+        return rect
+
+    def is_on_screen(self, element, window_size=None):
+        """Whether the element lies completely within the window"""
+
+        window_size = window_size or self.window_size()
+        rect = self.rect(element)
+        return (rect['x'] > 0 and rect['x'] + rect['width'] <= window_size['width']) and (
+                rect['y'] > 0 and rect['y'] + rect['height'] <= window_size['height'])
+
+    def filter_on_screen(self, elements):
+        """Elements that lie completely within the window, one call per element"""
+
+        window_size = self.window_size()
+        return [element for element in elements if element and self.is_on_screen(element, window_size)]
+
+
+def _unknown_command(error):
+    return type(error) is WebDriverException or isinstance(error, UnknownMethodException)
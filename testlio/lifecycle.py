@@ -0,0 +1,169 @@
+import atexit
+import sys
+import threading
+import time
+
+from appium import webdriver
+
+try:
+    from testlio.sessions import SessionPool
+except ImportError:
+    from sessions import SessionPool
+
+
+class BackgroundCall(threading.Thread):
+    """Calls target on a separate thread and keeps its result, exception and duration"""
+
+    # Whether the process may exit without waiting for the call
+    abandon_at_exit = False
+
+    def __init__(self, target, *args, **kwargs):
+        threading.Thread.__init__(self)
+        self.daemon = self.abandon_at_exit
+        self._target_call = (target, args, kwargs)
+        self._result = None
+        self.error = None
+        self.duration = None
+        self.start()
+
+    def run(self):
+        target, args, kwargs = self._target_call
+        started = time.time()
+        try:
+            self._result = target(*args, **kwargs)
+        except:
+            self.error = sys.exc_info()[1]
+        self.duration = time.time() - started
+
+    def result(self, timeout=None):
+        self.join(timeout)
+        if self.error is not None:
+            raise self.error
+        return self._result
+
+
+class PrefetchCall(BackgroundCall):
+    """Creation of a session nobody may use, e.g. after the last test"""
+
+    abandon_at_exit = True
+
+
+class SessionPipeline(object):
+    """
+    Overlaps the slow ends of consecutive tests: the finished session is quit and
+    its logs are flushed in the background while the session for the next test is
+    already being created against the same executor. Only usable where the device
+    can host a second session while the first one is shutting down (emulators,
+    simulators, grids).
+    """
+
+    # (executor, udid) -> (capabilities signature, BackgroundCall creating a driver)
+    prefetched = {}
+    retiring = []
+    # (executor, udid) -> durations of the background phases of tests retired on the
+    # device and not yet reported: {'test', 'log_flush', 'session_quit'}
+    timings = {}
+    # Kept per device until the next test reports them
+    max_timings = 8
+    lock = threading.Lock()
+
+    @classmethod
+    def prefetch(cls, executor, capabilities, command_executor=None):
+        """Start creating a session for the next test"""
+
+        key = (executor, capabilities.get('udid'))
+        call = PrefetchCall(webdriver.Remote,
+                            desired_capabilities=dict(capabilities),
+                            command_executor=command_executor or executor)
+        with cls.lock:
+            previous = cls.prefetched.pop(key, None)
+            cls.prefetched[key] = (SessionPool._signature(capabilities), call)
+        if previous:
+            cls._retire_call(previous[1])
+
+    @classmethod
+    def take(cls, executor, capabilities):
+        """Prefetched session matching capabilities, None if there is none or creating it failed"""
+
+        key = (executor, capabilities.get('udid'))
+        with cls.lock:
+            prefetched = cls.prefetched.pop(key, None)
+        if not prefetched:
+            return None
+
+        signature, call = prefetched
+        if signature != SessionPool._signature(capabilities):
+            cls._retire_call(call)
+            return None
+        try:
+            return call.result()
+        except:
+            return None
+
+    @classmethod
+    def retire(cls, name, driver, event, executor, capabilities):
+        """Quit a finished session and flush the logs of its test in the background"""
+
+        key = (executor, capabilities.get('udid'))
+
+        def _retire():
+            timing = {'test': name}
+            started = time.time()
+            event.flush()
+            timing['log_flush'] = time.time() - started
+
+            started = time.time()
+            try:
+                driver.quit()
+            except:
+                pass
+            timing['session_quit'] = time.time() - started
+            cls._record(key, timing)
+
+        with cls.lock:
+            cls.retiring = [call for call in cls.retiring if call.is_alive()]
+            cls.retiring.append(BackgroundCall(_retire))
+
+    @classmethod
+    def take_timings(cls, executor, capabilities):
+        """Background timings of the tests retired on the device since the last call"""
+
+        with cls.lock:
+            return cls.timings.pop((executor, capabilities.get('udid')), [])
+
+    @classmethod
+    def drain(cls):
+        """
+        Wait for background quits and drop sessions nobody used. Sessions still being
+        created are abandoned, the server ends them after newCommandTimeout
+        """
+
+        with cls.lock:
+            retiring, cls.retiring = cls.retiring, []
+            prefetched = list(cls.prefetched.values())
+            cls.prefetched.clear()
+        for _, call in prefetched:
+            if not call.is_alive():
+                cls._retire_call(call).join()
+        for call in retiring:
+            call.join()
+
+    @classmethod
+    def _retire_call(cls, call):
+        def _quit():
+            try:
+                call.result().quit()
+            except:
+                pass
+
+        return BackgroundCall(_quit)
+
+    @classmethod
+    def _record(cls, key, timing):
+        with cls.lock:
+            timings = cls.timings.setdefault(key, [])
+            timings.append(timing)
+            del timings[:-cls.max_timings]
+
+
+atexit.register(SessionPipeline.drain)
@@ -0,0 +1,145 @@
+import json
+import os
+import re
+import threading
+
+from selenium.webdriver.common.by import By
+
+ACCESSIBILITY_ID = 'accessibility id'
+LOCATOR_CACHE_FILE = './locator_cache.json'
+
+# Case insensitive "contains" lookup on text and content-desc. This is the slowest
+# query UiAutomator can run, so it is only used until a cheaper locator is learnt
+NAME_XPATH = '//*[contains(translate(@text,"ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"),"{0}") or contains(translate(@content-desc,"ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"),"{0}")]'
+
+TEXT_XPATH_FORMAT = '//*[@text="{0}"]'
+TEXT_XPATH = re.compile(r'^//\*\[@text="([^"]*)"\]$')
+
+
+def name_xpath(name):
+    return NAME_XPATH.format(str(name).lower())
+
+
+def candidate_locators(element, name):
+    """
+    Cheaper locators that could match the element, cheapest first: accessibility
+    id (content-desc) and exact text xpath. Only those whose value contains the
+    name are returned, see encodes_name()
+    """
+
+    candidates = []
+
+    content_desc = _attribute(element, 'contentDescription', 'content-desc')
+    if content_desc:
+        candidates.append((ACCESSIBILITY_ID, content_desc))
+
+    text = _attribute(element, 'text')
+    if text and '"' not in text:
+        candidates.append((By.XPATH, TEXT_XPATH_FORMAT.format(text)))
+
+    return [locator for locator in candidates if encodes_name(locator, name)]
+
+
+def encodes_name(locator, name):
+    """
+    Whether everything locator finds has a content-desc or text containing name,
+    i.e. it can stand in for the name lookup without checking its hits. Locators
+    learnt by earlier versions (e.g. resource-id) don't
+    """
+
+    by, value = locator
+    if by == By.XPATH:
+        match = TEXT_XPATH.match(value)
+        if not match:
+            return False
+        value = match.group(1)
+    elif by != ACCESSIBILITY_ID:
+        return False
+    return _text(name).lower() in _text(value).lower()
+
+
+def _attribute(element, *names):
+    for name in names:
+        try:
+            value = element.get_attribute(name)
+        except Exception:
+            continue
+        if value and value != 'null':
+            return value
+    return None
+
+
+class NameLocatorCache(object):
+    """
+    Remembers which cheaper locator matched an element looked up by name on a
+    given screen and app version. The mapping is persisted to a json file so
+    later runs can try the fast locator first.
+    """
+
+    # One cache per file, shared by all tests in the process
+    caches = {}
+    caches_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, path=LOCATOR_CACHE_FILE):
+        with cls.caches_lock:
+            if path not in cls.caches:
+                cls.caches[path] = cls(path)
+            return cls.caches[path]
+
+    def __init__(self, path=LOCATOR_CACHE_FILE):
+        super(NameLocatorCache, self).__init__()
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._locators = {}
+
+        try:
+            with open(path, 'r') as cache_file:
+                self._locators = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            pass
+
+    @staticmethod
+    def key(app_version, screen, kind, name):
+        return u'|'.join([_text(app_version), _text(screen), kind, _text(name)])
+
+    def get(self, key):
+        with self._lock:
+            locator = self._locators.get(key)
+        return tuple(locator) if locator else None
+
+    def put(self, key, locator):
+        with self._lock:
+            if self._locators.get(key) == list(locator):
+                return
+            self._locators[key] = list(locator)
+            self._save()
+
+    def discard(self, key):
+        with self._lock:
+            if self._locators.pop(key, None) is not None:
+                self._save()
+
+    def _save(self):
+        # Write to a temporary file first so an interrupted run never leaves a broken cache
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'w') as cache_file:
+                json.dump(self._locators, cache_file, indent=1, sort_keys=True)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError):
+            pass
+
+
+def _text(value):
+    if value is None:
+        return u''
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'ignore')
+    try:
+        return unicode(value)
+    except NameError:
+        return str(value)
@@ -1,9 +1,30 @@
+import atexit
 import datetime
+import itertools
 import json
 import logging
 import os
+import random
 import sys
+import threading
+import time
 import traceback
+from collections import OrderedDict
+from functools import wraps
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+try:
+    from testlio.deadline import _monotonic
+    from testlio.eventcodec import CompactEventWriter
+    from testlio.sinks import CalabashSink, CompactSink, JsonSink, MemorySink
+except ImportError:
+    from deadline import _monotonic
+    from eventcodec import CompactEventWriter
+    from sinks import CalabashSink, CompactSink, JsonSink, MemorySink
 
 
 BASE = 'testlio.automation'
@@ -17,11 +38,369 @@ def configure_logger(logger, formatter, handler, level=logging.DEBUG):
     return logger
 
 
+class BufferedFileHandler(logging.FileHandler):
+    """
+    File handler that writes records in batches: the buffer is written once it
+    holds buffer_size bytes or interval seconds passed since the last write.
+    flush() writes the buffer, sync() additionally fsyncs the file.
+    """
+
+    def __init__(self, filename, buffer_size, interval, mode='a'):
+        logging.FileHandler.__init__(self, filename, mode)
+
+        self.buffer_size = buffer_size
+        self.interval = interval
+        self._buffer = []
+        self._buffered = 0
+        self._written = time.time()
+
+    def emit(self, record):
+        try:
+            message = self.format(record) + '\n'
+        except Exception:
+            self.handleError(record)
+            return
+
+        self._buffer.append((record.created, message))
+        self._buffered += len(message)
+        if self._buffered >= self.buffer_size or time.time() - self._written >= self.interval:
+            self._write_buffer()
+
+    def flush(self):
+        self.acquire()
+        try:
+            self._write_buffer()
+        finally:
+            self.release()
+
+    def sync(self):
+        """Write the buffer and make sure it reached the disk"""
+
+        self.acquire()
+        try:
+            self._write_buffer()
+            if self.stream:
+                os.fsync(self.stream.fileno())
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        logging.FileHandler.close(self)
+
+    def _write_buffer(self):
+        if self._buffer and self.stream:
+            self.stream.write(''.join(message for _, message in self._buffer))
+            self.stream.flush()
+        self._buffer = []
+        self._buffered = 0
+        self._written = time.time()
+
+
+class RotatingEventHandler(BufferedFileHandler):
+    """
+    Splits a log into segments of at most max_bytes or max_seconds: the first
+    segment is the log file itself, later ones get .1, .2, ... appended. The
+    manifest next to the log (<log>.segments.json) has the time range, size and
+    first and last event of every segment, see segment_at().
+    """
+
+    # Length of the first and last event kept in the manifest
+    EVENT_PREVIEW = 200
+
+    def __init__(self, filename, max_bytes=0, max_seconds=0, buffer_size=0, interval=0):
+        BufferedFileHandler.__init__(self, filename, buffer_size, interval)
+
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.manifest_path = manifest_path(self.baseFilename)
+        self.segments = _read_manifest(self.manifest_path)
+        if not self.segments:
+            self.segments = [self._segment(self.baseFilename, 0)]
+        elif self.segments[-1]['file'] != os.path.basename(self.baseFilename):
+            # continue in the last segment of an earlier run
+            self.stream.close()
+            self.stream = open(os.path.join(os.path.dirname(self.baseFilename), self.segments[-1]['file']), self.mode)
+
+    def flush(self):
+        BufferedFileHandler.flush(self)
+        self._write_manifest()
+
+    def _write_buffer(self):
+        if self._buffer and self.stream:
+            for created, message in self._buffer:
+                segment = self.segments[-1]
+                if segment['events'] and (
+                        (self.max_bytes and segment['bytes'] + len(message) > self.max_bytes) or
+                        (self.max_seconds and created - segment['started'] >= self.max_seconds)):
+                    self._rotate()
+                    segment = self.segments[-1]
+
+                self.stream.write(message)
+                if not segment['events']:
+                    segment['started'] = created
+                    segment['first'] = message[:self.EVENT_PREVIEW].rstrip('\n')
+                segment['ended'] = created
+                segment['last'] = message[:self.EVENT_PREVIEW].rstrip('\n')
+                segment['events'] += 1
+                segment['bytes'] += len(message)
+            self.stream.flush()
+        self._buffer = []
+        self._buffered = 0
+        self._written = time.time()
+
+    def _rotate(self):
+        self.stream.flush()
+        self.stream.close()
+        index = len(self.segments)
+        path = '%s.%d' % (self.baseFilename, index)
+        self.stream = open(path, self.mode)
+        self.segments.append(self._segment(path, index))
+        self._write_manifest()
+
+    def _segment(self, path, index):
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        return {'file': os.path.basename(path), 'index': index, 'started': None, 'ended': None,
+                'first': None, 'last': None, 'events': 0, 'bytes': size}
+
+    def _write_manifest(self):
+        segments = []
+        for segment in self.segments:
+            segment = dict(segment)
+            for key in ('started', 'ended'):
+                if segment[key] is not None:
+                    segment[key] = datetime.datetime.utcfromtimestamp(segment[key]).isoformat()
+            segments.append(segment)
+
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as manifest_file:
+            json.dump({'log': os.path.basename(self.baseFilename), 'segments': segments}, manifest_file, indent=2)
+        os.rename(tmp_path, self.manifest_path)
+
+
+def manifest_path(log_path):
+    """Path of the segment manifest of a log"""
+
+    return log_path + '.segments.json'
+
+
+def _read_manifest(path):
+    """Segments of a manifest with their times as seconds since the epoch"""
+
+    if not os.path.exists(path):
+        return []
+    with open(path) as manifest_file:
+        segments = json.load(manifest_file)['segments']
+    for segment in segments:
+        for key in ('started', 'ended'):
+            if segment[key] is not None:
+                iso_format = '%Y-%m-%dT%H:%M:%S.%f' if '.' in segment[key] else '%Y-%m-%dT%H:%M:%S'
+                segment[key] = _epoch_seconds(datetime.datetime.strptime(segment[key], iso_format))
+    return segments
+
+
+def _epoch_seconds(timestamp):
+    delta = timestamp - datetime.datetime(1970, 1, 1)
+    return delta.days * 86400 + delta.seconds + delta.microseconds / 1000000.0
+
+
+def segment_at(log_path, timestamp):
+    """
+    File of the segment of a rotated log to start reading at for the event at
+    timestamp (naive UTC datetime, as in the events), the log itself if it was
+    never rotated
+    """
+
+    segments = _read_manifest(manifest_path(log_path))
+    if not segments:
+        return log_path
+
+    # Segment times are taken when the event is written, never before its own
+    # timestamp, so the first segment ending later holds the event or precedes it
+    seconds = _epoch_seconds(timestamp)
+    found = segments[-1]
+    for segment in segments:
+        if segment['ended'] is not None and segment['ended'] >= seconds:
+            found = segment
+            break
+    return os.path.join(os.path.dirname(log_path), found['file'])
+
+
+class ReattachingHandler(logging.Handler):
+    """
+    Stands in for the file handler of a logger closed beyond max_open_loggers while
+    its test may still be running, the next record reattaches the file
+    """
+
+    def __init__(self, name, message_format, path, rotate=False):
+        logging.Handler.__init__(self)
+
+        self.logger_name = name
+        self.message_format = message_format
+        self.path = path
+        self.rotate = rotate
+
+    def emit(self, record):
+        logger = EventLogger._get_logger(self.logger_name, self.message_format, self.path, self.rotate)
+        for handler in logger.handlers:
+            handler.handle(record)
+
+
+class EventQueue(object):
+    """
+    Writes log events on a listener thread so logging I/O never runs on the test
+    thread. Items are lightweight (write, args) tuples, drain() blocks until all
+    queued events are written and runs at interpreter exit as well.
+    """
+
+    def __init__(self):
+        super(EventQueue, self).__init__()
+
+        self._queue = Queue()
+        self._listener = threading.Thread(target=self._listen)
+        self._listener.daemon = True
+        self._listener.start()
+        atexit.register(self.drain)
+
+    def put(self, write, *args):
+        self._queue.put((write, args))
+
+    def drain(self):
+        self._queue.join()
+
+    def _listen(self):
+        while True:
+            write, args = self._queue.get()
+            try:
+                write(*args)
+            except Exception:
+                pass
+            finally:
+                self._queue.task_done()
+
+
+class Span(object):
+    """
+    Logs a begin and an end span event around a block. Both carry the monotonic
+    clock in seconds and the id of the enclosing span of the same thread, the end
+    event has the duration and the exception type if the block raised.
+    """
+
+    ids = itertools.count(1)
+    stacks = threading.local()
+
+    def __init__(self, event, name, args=None):
+        super(Span, self).__init__()
+
+        self.event = event
+        self.name = name
+        self.args = args or {}
+        self.id = None
+        self.parent = None
+        self.started = None
+
+    def __enter__(self):
+        stack = Span._stack()
+        self.id = next(Span.ids)
+        self.parent = stack[-1].id if stack else None
+        stack.append(self)
+        self.started = _monotonic()
+        self.event._log(self.event._event_data('span', self._data('begin', self.started)))
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        ended = _monotonic()
+        stack = Span._stack()
+        if self in stack:
+            stack.remove(self)
+
+        data = self._data('end', ended)
+        data['duration'] = ended - self.started
+        if exc_type is not None:
+            data['error'] = exc_type.__name__
+        self.event._log(self.event._event_data('span', data))
+        return False
+
+    def _data(self, phase, clock):
+        data = {
+            'name': self.name,
+            'phase': phase,
+            'id': self.id,
+            'parent': self.parent,
+            'thread': threading.current_thread().ident,
+            'clock': clock
+        }
+        if self.args and phase == 'begin':
+            data['args'] = self.args
+        return data
+
+    @classmethod
+    def _stack(cls):
+        if not hasattr(cls.stacks, 'spans'):
+            cls.stacks.spans = []
+        return cls.stacks.spans
+
+
+class NullSpan(object):
+    """Span used when there is no logger or span events are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
 class EventLogger(object):
     """Logging Testlio automation events"""
 
-    # Keep track of loggers created so not to configure twice
-    loggers = {}
+    # Keep track of loggers created so not to configure twice, least recently used
+    # first. Beyond MAX_OPEN_LOGGERS the files of the least recently used ones are
+    # closed, they are opened again when their test logs another event
+    loggers = OrderedDict()
+    max_open_loggers = int(os.getenv('MAX_OPEN_LOGGERS', '32'))
+    loggers_lock = threading.RLock()
+    # Logger name -> (message format, path, rotate) to open its file again with
+    logger_files = {}
+    # File path -> [handler, number of loggers using it]
+    file_handlers = {}
+
+    # Write events from a listener thread (ASYNC_EVENT_LOG=true)
+    async_logging = os.getenv('ASYNC_EVENT_LOG', '').lower() in ('1', 'true')
+    event_queue = None
+    event_queue_lock = threading.Lock()
+
+    # Batch log writes (EVENT_LOG_BUFFER_KB=64), the buffer is written at least every
+    # EVENT_LOG_BUFFER_SECONDS and synced to disk at stop, on errors and soft failures
+    buffer_size = int(os.getenv('EVENT_LOG_BUFFER_KB', '0')) * 1024
+    buffer_interval = float(os.getenv('EVENT_LOG_BUFFER_SECONDS', '5'))
+
+    # Split test logs into segments (EVENT_LOG_ROTATE_MB=100, EVENT_LOG_ROTATE_SECONDS=3600)
+    rotate_bytes = int(float(os.getenv('EVENT_LOG_ROTATE_MB', '0')) * 1024 * 1024)
+    rotate_seconds = float(os.getenv('EVENT_LOG_ROTATE_SECONDS', '0'))
+
+    # EVENT_LOG_FORMAT=compact writes logs/<test>.events in the binary format of
+    # testlio.eventcodec instead of json lines, convert with python -m testlio.eventcodec
+    event_log_format = os.getenv('EVENT_LOG_FORMAT', 'json').lower()
+    compact_writers = {}
+
+    # Where events go, e.g. EVENT_SINKS=json,compact. Defaults to calabash on testdroid
+    # and to EVENT_LOG_FORMAT otherwise
+    sink_names = [sink for sink in os.getenv('EVENT_SINKS', '').split(',') if sink]
+
+    # Logger of the test running on the current thread, used by span()
+    active = threading.local()
+    # Log spans of traced calls, for python -m testlio.trace (TRACE_SPANS=true)
+    trace_spans = os.getenv('TRACE_SPANS', '').lower() in ('1', 'true')
+
+    # Event types that are not logged, e.g. DISABLED_EVENTS=find,click
+    disabled_events = set(event_type for event_type in os.getenv('DISABLED_EVENTS', '').split(',') if event_type)
+    # Share of events of a type that are logged, e.g. EVENT_SAMPLING=find=0.1,success=0.25
+    sampling_rates = dict((event_type, float(rate)) for event_type, _, rate in (
+        item.partition('=') for item in os.getenv('EVENT_SAMPLING', '').split(',') if '=' in item))
 
     # Configure base logger once
     base_logger = configure_logger(
@@ -30,53 +409,127 @@ class EventLogger(object):
         logging.StreamHandler())
 
     @classmethod
-    def get_logger_testlio(cls, name):
-        # full_path = os.path.join(get_path_to_tests_folder(name), DIR)
-        if not os.path.exists(DIR):
-            os.makedirs(DIR)
-        if not cls.loggers.has_key(name):
+    def get_event_queue(cls):
+        with cls.event_queue_lock:
+            if cls.event_queue is None:
+                cls.event_queue = EventQueue()
+        return cls.event_queue
+
+    @classmethod
+    def file_handler(cls, path, rotate=False):
+        """Handler writing to path, buffered if a buffer size is configured"""
 
-            # Calculate the log file name
-            file_name = '.'.join(name.split('.')[1:]) if len(name.split('.')) > 2 else name
+        if rotate and (cls.rotate_bytes or cls.rotate_seconds):
+            return RotatingEventHandler(path, cls.rotate_bytes, cls.rotate_seconds,
+                                        cls.buffer_size, cls.buffer_interval if cls.buffer_size > 0 else 0)
+        if cls.buffer_size > 0:
+            return BufferedFileHandler(path, cls.buffer_size, cls.buffer_interval)
+        return logging.FileHandler(path)
 
-            cls.loggers[name] = configure_logger(
-                logging.getLogger('{base}.{name}'.format(base=BASE, name=name)),
-                logging.Formatter('%(message)s'),
-                logging.FileHandler('{dir}/{name}.log'.format(dir=DIR, name=file_name)))
-        return cls.loggers[name]
+    @classmethod
+    def get_logger_testlio(cls, name):
+        return cls._get_logger(name, '%(message)s', cls.log_path(name), rotate=True)
 
     @classmethod
-    def get_logger_calabash(cls, name):
-        # full_path = os.path.join(get_path_to_tests_folder(name), DIR)
+    def get_compact_writer(cls, name):
         if not os.path.exists(DIR):
             os.makedirs(DIR)
-        if not cls.loggers.has_key(name):
+        if name not in cls.compact_writers:
+            cls.compact_writers[name] = CompactEventWriter(cls.log_path(name, 'events'))
+        return cls.compact_writers[name]
 
-            cls.loggers[name] = configure_logger(
-                logging.getLogger('{base}.{name}'.format(base=BASE, name=name)),
-                logging.Formatter('\t\t%(message)s'),
-                logging.FileHandler('calabash.log'))
+    @staticmethod
+    def log_path(name, extension='log'):
+        """Path of the event log file of a test"""
 
-        return cls.loggers[name]
+        # Calculate the log file name
+        file_name = '.'.join(name.split('.')[1:]) if len(name.split('.')) > 2 else name
+        return '{dir}/{name}.{extension}'.format(dir=DIR, name=file_name, extension=extension)
+
+    @classmethod
+    def get_logger_calabash(cls, name):
+        return cls._get_logger(name, '\t\t%(message)s', 'calabash.log')
 
     @classmethod
     def get_logger_to_drop_page_source(cls, name):
+        return cls._get_logger(name, '\t\t%(message)s', 'console.log')
+
+    @classmethod
+    def _get_logger(cls, name, message_format, path, rotate=False):
+        """Logger writing to path, the least recently used loggers are closed beyond max_open_loggers"""
+
         # full_path = os.path.join(get_path_to_tests_folder(name), DIR)
         if not os.path.exists(DIR):
             os.makedirs(DIR)
-        if not cls.loggers.has_key(name):
+        with cls.loggers_lock:
+            if name in cls.loggers:
+                logger = cls.loggers.pop(name)
+            else:
+                logger = logging.getLogger('{base}.{name}'.format(base=BASE, name=name))
+                # a new list, callHandlers may be iterating over the one with the stand in
+                logger.handlers = [handler for handler in logger.handlers
+                                   if not isinstance(handler, ReattachingHandler)]
+                configure_logger(logger, logging.Formatter(message_format), cls._acquire_handler(path, rotate))
+            cls.loggers[name] = logger
+
+            while len(cls.loggers) > cls.max_open_loggers:
+                evicted = next(iter(cls.loggers))
+                if evicted == name:
+                    break
+                evicted_logger = cls.loggers[evicted]
+                stand_in = ReattachingHandler(evicted, *cls.logger_files[evicted])
+                cls._release_logger(evicted, close_writer=False)
+                evicted_logger.addHandler(stand_in)
+            cls.logger_files[name] = (message_format, path, rotate)
+        return logger
 
-            cls.loggers[name] = configure_logger(
-                logging.getLogger('{base}.{name}'.format(base=BASE, name=name)),
-                logging.Formatter('\t\t%(message)s'),
-                logging.FileHandler('console.log'))
+    @classmethod
+    def _acquire_handler(cls, path, rotate=False):
+        """Handler of path shared by all loggers writing to it"""
 
-        return cls.loggers[name]
+        path = os.path.abspath(path)
+        if path not in cls.file_handlers:
+            cls.file_handlers[path] = [cls.file_handler(path, rotate), 0]
+        cls.file_handlers[path][1] += 1
+        return cls.file_handlers[path][0]
 
-    def __init__(self, name, hosting_platform, test_file_dir=None, test_file_name=None):
+    @classmethod
+    def _release_logger(cls, name, close_writer=True):
+        """Detach the handlers of a logger, closing the ones no other logger uses"""
+
+        with cls.loggers_lock:
+            logger = cls.loggers.pop(name, None)
+            cls.logger_files.pop(name, None)
+            compact = cls.compact_writers.pop(name, None) if close_writer else None
+            if compact:
+                compact.close()
+            if logger is None:
+                # closed beyond max_open_loggers earlier, drop the stand in
+                logger = logging.Logger.manager.loggerDict.get('{base}.{name}'.format(base=BASE, name=name))
+                if isinstance(logger, logging.Logger):
+                    logger.handlers = [handler for handler in logger.handlers
+                                       if not isinstance(handler, ReattachingHandler)]
+                return
+
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                entry = cls.file_handlers.get(getattr(handler, 'baseFilename', None))
+                if entry is None:
+                    handler.close()
+                    continue
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del cls.file_handlers[handler.baseFilename]
+                    handler.close()
+
+    def __init__(self, name, hosting_platform, test_file_dir=None, test_file_name=None, sinks=None):
         super(EventLogger, self).__init__()
 
+        self.name = name
         self.hosting_platform = hosting_platform
+        # Names of the loggers this test holds in EventLogger.loggers
+        self._logger_names = [name]
+        EventLogger.active.logger = self
 
         if self.hosting_platform == 'testdroid':
             ndx = str.index(name, '.')
@@ -84,12 +537,11 @@ class EventLogger(object):
             script_name = name[ndx+1:]
 
             main_file_name = 'calabash.log'
-            main_file = open(main_file_name, 'a')
-
-            # Should look like:
-            # Feature: tests.test_script_a.TestClassA
-            main_file.write("\nFeature: %s.%s.%s\n\n" % (test_file_dir, test_file_name, class_name))
-            main_file.write("    Scenario: %s                                             # features/my_first.feature:3\n\n" % script_name)
+            with open(main_file_name, 'a') as main_file:
+                # Should look like:
+                # Feature: tests.test_script_a.TestClassA
+                main_file.write("\nFeature: %s.%s.%s\n\n" % (test_file_dir, test_file_name, class_name))
+                main_file.write("    Scenario: %s                                             # features/my_first.feature:3\n\n" % script_name)
 
             self._logger = EventLogger.get_logger_calabash(name)
             self._source_logger = EventLogger.get_logger_to_drop_page_source('additional_custom_logger')
@@ -97,6 +549,28 @@ class EventLogger(object):
             self._logger = EventLogger.get_logger_testlio(name)
             self._source_logger = self._logger
 
+        self.sinks = list(sinks) if sinks is not None else [self._sink(sink) for sink in self._default_sinks()]
+
+    def _default_sinks(self):
+        if self.sink_names:
+            return self.sink_names
+        if self.hosting_platform == 'testdroid':
+            return ['calabash']
+        return [self.event_log_format]
+
+    def _sink(self, sink_name):
+        if sink_name == 'calabash':
+            return CalabashSink(self._logger)
+        if sink_name == 'compact':
+            return CompactSink(EventLogger.get_compact_writer(self.name))
+        if sink_name == 'memory':
+            return MemorySink()
+        if self.hosting_platform == 'testdroid':
+            # self._logger writes calabash.log, json lines go to the usual test log
+            self._logger_names.append('json.' + self.name)
+            return JsonSink(EventLogger.get_logger_testlio(self._logger_names[-1]))
+        return JsonSink(self._logger)
+
     def start(self, data=None):
         """Log start event"""
 
@@ -106,38 +580,111 @@ class EventLogger(object):
         """Log stop event"""
 
         self._log_info(self._event_data('stop'))
+        self.sync()
+
+    def close(self):
+        """Write the remaining events and close the log files of this test"""
+
+        self.sync()
+        for name in self._logger_names:
+            EventLogger._release_logger(name)
+        if getattr(EventLogger.active, 'logger', None) is self:
+            EventLogger.active.logger = None
+
+    def span(self, span_name, args=None):
+        """
+        Context manager timing a block as a span, spans opened inside it are its
+        children. args is a dict logged with the begin event, values other than
+        plain strings and numbers are left out.
+        """
+
+        if not self.trace_spans or not self.sample('span'):
+            return NULL_SPAN
+        return Span(self, span_name, _span_args(args) if args else None)
+
+    def is_enabled(self, event_type):
+        """Whether events of this type are logged at all"""
+
+        return event_type not in self.disabled_events and self.sampling_rates.get(event_type, 1) > 0
+
+    def sample(self, event_type):
+        """Decide whether to log the next event of this type, honouring its sampling rate"""
+
+        if not self.is_enabled(event_type):
+            return False
+        rate = self.sampling_rates.get(event_type, 1)
+        return rate >= 1 or random.random() < rate
+
+    def flush(self):
+        """Flush log handlers of this test"""
+
+        if self.async_logging:
+            self.get_event_queue().drain()
+        for sink in self.sinks:
+            sink.flush()
+        for handler in self._source_logger.handlers:
+            handler.flush()
+
+    def sync(self):
+        """Write buffered events of this test and sync them to disk"""
+
+        if self.async_logging:
+            self.get_event_queue().drain()
+        for sink in self.sinks:
+            sink.sync()
+        for handler in self._source_logger.handlers:
+            if isinstance(handler, BufferedFileHandler):
+                handler.sync()
+            else:
+                handler.flush()
 
     def assertion(self, data=None, **kwargs):
         """Log assert event"""
 
-        self._log_info(self._event_data('assert', data, **kwargs))
+        self._log_event('assert', data, **kwargs)
 
-    def click(self, data=None, **kwargs):
-        """Log element click event"""
+    def click(self, data=None, sampled=None, **kwargs):
+        """Log element click event, sampled is the result of sample('click') if already drawn"""
 
-        self._log_info(self._event_data('click', data, **kwargs))
+        self._log_event('click', data, sampled, **kwargs)
 
     def find(self, **kwargs):
         """Log element find event"""
 
-        self._log_info(self._event_data('find', **kwargs))
+        self._log_event('find', **kwargs)
 
     def send_keys(self, data, **kwargs):
         """Log element send_keys event"""
 
-        self._log_info(self._event_data('send_keys', data, **kwargs))
+        self._log_event('send_keys', data, **kwargs)
+
+    def success(self, message, *args):
+        """Log a *** SUCCESS *** message, formatted with args only if it gets logged"""
+
+        if self.sample('success'):
+            self._log(self._event_data('*** SUCCESS *** ' + (message % args if args else message)))
 
     def accept_alert(self):
-        self._log_info(self._event_data('accept_alert'))
+        self._log_event('accept_alert')
 
     def dismiss_alert(self):
-        self._log_info(self._event_data('dismiss_alert'))
+        self._log_event('dismiss_alert')
+
+    def latency(self, data):
+        """Log latency summary event"""
+
+        self._log_info(self._event_data('latency', data))
 
     def screenshot(self, path):
         """Log screenshot event"""
 
         self._log_info({'screenshot': path})
 
+    def stored_screenshot(self, path, stored):
+        """Log where a screenshot referenced by path was stored"""
+
+        self._log_info({'screenshot': path, 'stored': stored})
+
     def validate_tcp(self, host, from_timestamp=None, to_timestamp=None, uri_contains=None,
                      body_contains=None, screenshot=None, request_present=None):
         """Log TCP validation event for post processing"""
@@ -178,12 +725,24 @@ class EventLogger(object):
             'trace': traceback.format_exc(exc_info[2])
         }
         self._log_error(data)
+        self.sync()
 
     def _validation_data(self, data, screenshot=None):
         """Create validation event data"""
 
         return self._event_data('validation', data, screenshot=screenshot)
 
+    def _log_event(self, event_type, event_data=None, sampled=None, **kwargs):
+        """
+        Log an event of event_type if it is sampled, the event is only built then.
+        event_data and element values may be callables producing the value.
+        """
+
+        if sampled is None:
+            sampled = self.sample(event_type)
+        if sampled:
+            self._log(self._event_data(event_type, event_data, **kwargs))
+
     def _event_data(self, event_type, event_data=None, **kwargs):
         """Create event data based on args"""
 
@@ -196,6 +755,8 @@ class EventLogger(object):
         element_data = self._element_data(**kwargs)
         if element_data:
             data['element'] = element_data
+        if callable(event_data):
+            event_data = event_data()
         if event_data != None:
             data['event']['data'] = event_data
         if kwargs.has_key('screenshot') and kwargs['screenshot']:
@@ -215,66 +776,66 @@ class EventLogger(object):
             if not key.startswith(prefix):
                 continue
             # Remove prefix from key and add to data
-            data[''.join(key.split('_')[1:])] = value
+            data[''.join(key.split('_')[1:])] = value() if callable(value) else value
 
         return data
 
-    def _format_dict_data(self, data):
-        out_str = ''
-        out_str += data.get('timestamp') + ' - '
+    def _log_info(self, data):
+        if 'event' in data and not self.sample(data['event'].get('type')):
+            return
+        self._log(data)
 
-        # screenshot has no event data
-        event_data = data.get('event')
-        if event_data:
-            out_str += event_data.get('type') + ' "'
+    def _log_error(self, data):
+        self._log(data, 'error')
 
-            element_data = data.get('element')
-            if element_data:
-                out_str += str(element_data) + ' "'
+    def _log(self, data, level='info'):
+        """Write now or hand the event to the listener thread in async mode"""
 
-            data_data = data.get('event').get('data')
-            if data_data:
-                out_str += str(data_data) + '"'
+        if self.async_logging:
+            self.get_event_queue().put(self._write, data, datetime.datetime.utcnow(), level)
+        else:
+            self._write(data, datetime.datetime.utcnow(), level)
 
-        ss_str = data.get('screenshot')
-        if ss_str:
-            ss_str = ss_str.split('/')[-1]
-            out_str += ' - ' + ss_str
+    def _write(self, data, timestamp, level):
+        """Fan the event out to every sink"""
 
-        return out_str
+        for sink in self.sinks:
+            sink.write(data, timestamp, level)
 
-    def _log_info(self, data):
-        if self.hosting_platform == 'testdroid':
-            try:
-                data['timestamp'] = datetime.datetime.utcnow().strftime('%H:%M:%S')
-                self._logger.info("Then " + self._format_dict_data(data) + "                                     # features/step_definitions/calabash_steps.rb")
-            except Exception, e:
-                self._logger.info("unhandled case in logger:")
-                self._logger.info(str(e))
-                self._logger.info(str(data))
-            if 'screenshot' in data:
-                self._logger.info('- java -jar /usr/local/rvm/gems/ruby-2.1.2@global/gems/calabash-android-0.5.14/lib/calabash-android/lib/screenshotTaker.jar "04135148006060008790" "%s"' % data['screenshot'])
+    def _log_to_console_log(self, data):
+        if self.async_logging:
+            self.get_event_queue().put(self._source_logger.info, data)
         else:
-            data['timestamp'] = datetime.datetime.utcnow().isoformat()
-            self._logger.info(json.dumps(data))
+            self._source_logger.info(data)
 
-    def _log_to_console_log(self, data):
-        self._source_logger.info(data)
 
-    def _log_error(self, data):
-        if self.hosting_platform == 'testdroid':
-            try:
-                data['timestamp'] = datetime.datetime.utcnow().strftime('%H:%M:%S')
-                self._logger.error("Step unsuccessful: " + self._format_dict_data(data) + "                                     # features/step_definitions/calabash_steps.rb")
-            except Exception, e:
-                self._logger.error("unhandled case in logger:")
-                self._logger.error(str(e))
-                self._logger.error(str(data))
-            if 'screenshot' in data:
-                self._logger.info('- java -jar /usr/local/rvm/gems/ruby-2.1.2@global/gems/calabash-android-0.5.14/lib/calabash-android/lib/screenshotTaker.jar "04135148006060008790" "%s"' % data['screenshot'])
-        else:
-            data['timestamp'] = datetime.datetime.utcnow().isoformat()
-            self._logger.error(json.dumps(data))
+def span(span_name, args=None):
+    """Span of the test running on the current thread, does nothing outside of tests"""
+
+    logger = getattr(EventLogger.active, 'logger', None)
+    if logger is None:
+        return NULL_SPAN
+    return logger.span(span_name, args)
+
+
+def traced(name):
+    """Decorator timing every call as a span, plain keyword arguments are logged with it"""
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            # kwargs go as one dict, they may well contain a name= locator
+            with span(name, kwargs):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _span_args(kwargs):
+    return dict((key, value) for key, value in kwargs.items()
+                if isinstance(value, (str, type(u''), int, float, bool)))
 
 
 def get_path_to_tests_folder(name):
@@ -0,0 +1,78 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+
+class LatencyRecorder(object):
+    """Latencies in seconds grouped by name (e.g. webdriver command)"""
+
+    def __init__(self):
+        super(LatencyRecorder, self).__init__()
+
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._latencies.setdefault(name, []).append(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        """Record how long the with block took"""
+
+        started = time.time()
+        try:
+            yield
+        finally:
+            self.record(name, time.time() - started)
+
+    def summary(self):
+        """count, mean, p50, p95 and max per name"""
+
+        with self._lock:
+            latencies = dict((name, sorted(values)) for name, values in self._latencies.items())
+
+        return dict((name, {
+            'count': len(values),
+            'mean': sum(values) / len(values),
+            'p50': _percentile(values, 50),
+            'p95': _percentile(values, 95),
+            'max': values[-1]
+        }) for name, values in latencies.items())
+
+    def clear(self):
+        with self._lock:
+            self._latencies = {}
+
+
+def instrument_driver(driver, recorder):
+    """
+    Record the duration of every command the driver sends into recorder, including
+    the ones sent by its elements (they all go through driver.execute). Calling it
+    again for the same driver only swaps the recorder.
+    """
+
+    driver.command_metrics = recorder
+    if getattr(driver.execute, 'instrumented', False):
+        return driver
+
+    execute = driver.execute
+
+    def timed_execute(driver_command, params=None):
+        started = time.time()
+        try:
+            return execute(driver_command, params)
+        finally:
+            driver.command_metrics.record(driver_command, time.time() - started)
+
+    timed_execute.instrumented = True
+    driver.execute = timed_execute
+    return driver
+
+
+def _percentile(sorted_values, percent):
+    """Nearest rank percentile of already sorted values"""
+
+    index = int(math.ceil(percent / 100.0 * len(sorted_values))) - 1
+    return sorted_values[min(max(index, 0), len(sorted_values) - 1)]
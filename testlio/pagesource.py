@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+import os
+import re
+import sys
+import threading
+
+PAGE_SOURCES_DIR = './page_sources'
+REFERENCE = 'page_source sha1:{digest}'
+REFERENCE_PATTERN = re.compile(r'page_source sha1:([0-9a-f]{40})')
+
+
+class PageSourceArchive(object):
+    """
+    Keeps each distinct page source once, gzipped and named by the sha1 of its
+    content. Logs only carry the reference returned by add(), expand() puts the
+    page sources back in.
+    """
+
+    # One archive per directory, shared by all tests of the run
+    archives = {}
+    archives_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, directory=PAGE_SOURCES_DIR):
+        with cls.archives_lock:
+            if directory not in cls.archives:
+                cls.archives[directory] = cls(directory)
+            return cls.archives[directory]
+
+    def __init__(self, directory=PAGE_SOURCES_DIR):
+        super(PageSourceArchive, self).__init__()
+
+        self.directory = directory
+        self._lock = threading.Lock()
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def add(self, page_source):
+        """Store the page source unless it is already archived, returns its reference"""
+
+        if not isinstance(page_source, bytes):
+            page_source = page_source.encode('utf-8')
+        digest = hashlib.sha1(page_source).hexdigest()
+        path = self.path(digest)
+
+        with self._lock:
+            if not os.path.exists(path):
+                # Write aside and rename so readers never see a partial file
+                tmp_path = path + '.tmp'
+                archive_file = gzip.open(tmp_path, 'wb')
+                try:
+                    archive_file.write(page_source)
+                finally:
+                    archive_file.close()
+                os.rename(tmp_path, path)
+
+        return REFERENCE.format(digest=digest)
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest + '.xml.gz')
+
+    def read(self, digest):
+        """Page source (utf-8 bytes) stored under digest"""
+
+        archive_file = gzip.open(self.path(digest), 'rb')
+        try:
+            return archive_file.read()
+        finally:
+            archive_file.close()
+
+    def expand(self, line):
+        """Replace the references in line with the page sources they point to"""
+
+        def _page_source(match):
+            try:
+                return self.read(match.group(1)).decode('utf-8')
+            except (IOError, OSError):
+                return match.group(0) + ' (missing)'
+
+        return REFERENCE_PATTERN.sub(_page_source, line)
+
+
+def main(args=None):
+    args = sys.argv[1:] if args is None else args
+    if len(args) not in (1, 2):
+        sys.stderr.write('usage: python -m testlio.pagesource LOG_FILE [PAGE_SOURCES_DIR]\n')
+        return 2
+
+    archive = PageSourceArchive(args[1] if len(args) == 2 else PAGE_SOURCES_DIR)
+    with open(args[0]) as log_file:
+        for line in log_file:
+            expanded = archive.expand(line.decode('utf-8') if isinstance(line, bytes) else line)
+            sys.stdout.write(expanded.encode('utf-8') if str is bytes else expanded)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
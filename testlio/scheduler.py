@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+import time
+import traceback
+import unittest
+
+try:
+    from testlio.log import DIR, EventLogger
+except ImportError:
+    from log import DIR, EventLogger
+
+SUMMARY_FILE = DIR + '/summary.json'
+
+
+class DevicePool(object):
+    """
+    Runs test methods of TestlioAutomationTest classes concurrently, one test
+    at a time on each device. Devices are (executor, udid) pairs.
+
+        pool = DevicePool([('http://host:4723/wd/hub', 'udid1'),
+                           ('http://host:4724/wd/hub', 'udid2')])
+        results = pool.run(MyTests)
+    """
+
+    def __init__(self, devices, summary_file=SUMMARY_FILE):
+        super(DevicePool, self).__init__()
+
+        self.devices = [{'executor': executor, 'udid': udid} for executor, udid in devices]
+        self.summary_file = summary_file
+        self.results = []
+        self._lock = threading.Lock()
+        self._pending = []
+
+    def run(self, *test_classes):
+        """Run all test methods of the classes, returns the list of results"""
+
+        if not os.path.exists(DIR):
+            os.makedirs(DIR)
+
+        self.results = []
+        self._pending = [(test_class, name) for test_class in test_classes
+                         for name in unittest.TestLoader().getTestCaseNames(test_class)]
+
+        started = time.time()
+        workers = [threading.Thread(target=self._work, args=(device,)) for device in self.devices]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self._write_summary(time.time() - started)
+        return self.results
+
+    def _next(self):
+        with self._lock:
+            return self._pending.pop(0) if self._pending else None
+
+    def _work(self, device):
+        while True:
+            test = self._next()
+            if test is None:
+                return
+            result = self._run_test(test[0], test[1], device)
+            with self._lock:
+                self.results.append(result)
+
+    def _run_test(self, test_class, name, device):
+        test = test_class(name)
+        test.device = device
+        method = getattr(test, name)
+
+        result = {
+            'test': type(test).__name__ + '.' + name,
+            'device': device,
+            'status': 'passed',
+            'log': EventLogger.log_path(type(test).__name__ + '.' + name)
+        }
+
+        started = time.time()
+        try:
+            test.setup_method(method)
+            try:
+                method()
+            finally:
+                with self._lock:
+                    # no session to prefetch once the queue is empty
+                    test.prefetch_next = bool(self._pending)
+                test.teardown_method(method)
+        except test.failureException:
+            result['status'] = 'failed'
+            result['error'] = traceback.format_exc()
+        except Exception:
+            result['status'] = 'error'
+            result['error'] = traceback.format_exc()
+        result['duration'] = time.time() - started
+
+        print('{0} {1} on {2} in {3:.1f}s'.format(result['status'].upper(), result['test'],
+                                                  device['udid'], result['duration']))
+        return result
+
+    def _write_summary(self, wall_time):
+        summary = {
+            'devices': self.devices,
+            'wall_time': wall_time,
+            'tests': len(self.results),
+            'results': sorted(self.results, key=lambda result: result['test'])
+        }
+        for status in ('passed', 'failed', 'error'):
+            summary[status] = len([result for result in self.results if result['status'] == status])
+
+        if self.summary_file:
+            with open(self.summary_file, 'w') as summary_file:
+                json.dump(summary, summary_file, indent=2)
+
+        return summary
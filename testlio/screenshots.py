@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import threading
+
+try:
+    from Queue import Queue
+except ImportError:
+    from queue import Queue
+
+try:
+    from PIL import Image
+except ImportError:
+    # thumbnails are optional
+    Image = None
+
+SCREENSHOTS_DIR = './screenshots'
+DEFAULT_QUEUE_DEPTH = 4
+
+
+class ScreenshotQueue(object):
+    """
+    Takes screenshots on a worker thread. The test gets the path the screenshot
+    will be written to right away and only blocks when more than max_depth
+    screenshots are waiting. flush() waits until every queued screenshot is written.
+    """
+
+    def __init__(self, capture, max_depth=DEFAULT_QUEUE_DEPTH):
+        super(ScreenshotQueue, self).__init__()
+
+        # capture(path) takes the screenshot and writes it to path
+        self._capture = capture
+        self._queue = Queue(maxsize=max_depth)
+        self.failed = []
+
+        self._worker = threading.Thread(target=self._work)
+        self._worker.daemon = True
+        self._worker.start()
+
+    def put(self, path):
+        self._queue.put(path)
+        return path
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        """Flush and stop the worker"""
+
+        self._queue.put(None)
+        self._worker.join()
+
+    def _work(self):
+        while True:
+            path = self._queue.get()
+            try:
+                if path is None:
+                    return
+                if not self._capture(path):
+                    self.failed.append(path)
+            except Exception:
+                self.failed.append(path)
+            finally:
+                self._queue.task_done()
+
+
+class ScreenshotStore(object):
+    """
+    Keeps each distinct screenshot once, named by the sha1 of its content.
+    Screenshots stay referenced by the path they were taken under, index.jsonl
+    maps every reference to the stored file. Optionally writes downscaled
+    thumbnails and stops storing new images once the size budget of the run is used.
+    """
+
+    # One store per directory, shared by all tests of the run
+    stores = {}
+    stores_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, directory=SCREENSHOTS_DIR, budget=None, thumbnail_width=None):
+        with cls.stores_lock:
+            if directory not in cls.stores:
+                cls.stores[directory] = cls(directory, budget, thumbnail_width)
+            return cls.stores[directory]
+
+    def __init__(self, directory=SCREENSHOTS_DIR, budget=None, thumbnail_width=None):
+        super(ScreenshotStore, self).__init__()
+
+        self.directory = directory
+        self.budget = budget
+        self.thumbnail_width = thumbnail_width if Image else None
+        self.size = 0
+        self._lock = threading.Lock()
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def add(self, path):
+        """
+        Move the screenshot at path into the store, returns the stored file or
+        None when the budget does not allow a new image
+        """
+
+        if not os.path.exists(path):
+            return path
+
+        with open(path, 'rb') as screenshot_file:
+            content = screenshot_file.read()
+        digest = hashlib.sha1(content).hexdigest()
+        stored = os.path.join(self.directory, digest + '.png')
+
+        with self._lock:
+            if os.path.exists(stored):
+                os.remove(path)
+            elif self.budget and self.size + len(content) > self.budget:
+                os.remove(path)
+                stored = None
+            else:
+                os.rename(path, stored)
+                self.size += len(content)
+                self._thumbnail(stored, digest)
+
+            self._index(path, stored, digest)
+        return stored
+
+    def _index(self, reference, stored, digest):
+        with open(os.path.join(self.directory, 'index.jsonl'), 'a') as index_file:
+            index_file.write(json.dumps({'reference': reference, 'file': stored, 'sha1': digest}) + '\n')
+
+    def _thumbnail(self, stored, digest):
+        if not self.thumbnail_width:
+            return
+
+        thumbnails_dir = os.path.join(self.directory, 'thumbnails')
+        try:
+            if not os.path.exists(thumbnails_dir):
+                os.makedirs(thumbnails_dir)
+            image = Image.open(stored)
+            image.thumbnail((self.thumbnail_width, image.size[1]))
+            image.save(os.path.join(thumbnails_dir, digest + '.png'))
+        except (IOError, OSError):
+            pass
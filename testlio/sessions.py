@@ -0,0 +1,136 @@
+import atexit
+import json
+import logging
+import threading
+
+from appium import webdriver
+
+try:
+    from testlio.log import BASE
+except ImportError:
+    from log import BASE
+
+# Capabilities that change with every test and don't require a new session
+PER_TEST_CAPABILITIES = ('name', 'custom-data', 'testdroid_testrun')
+
+
+class SessionPool(object):
+    """
+    Appium sessions kept open across test methods, one per device. A pooled
+    session gets the app state reset instead of being recreated, a fresh one
+    is only started when the pooled session is unhealthy or was started with
+    different capabilities.
+    """
+
+    # (executor, udid) -> (capabilities signature, driver)
+    sessions = {}
+    lock = threading.Lock()
+
+    @classmethod
+    def acquire(cls, executor, capabilities, reset='restart', command_executor=None):
+        """
+        Return a ready to use driver for the device in capabilities. command_executor
+        is used instead of the executor url when a new session has to be created
+        """
+
+        key = (executor, capabilities.get('udid'))
+        signature = cls._signature(capabilities)
+
+        with cls.lock:
+            pooled = cls.sessions.pop(key, None)
+
+        if pooled:
+            pooled_signature, driver = pooled
+            if pooled_signature == signature and cls._is_healthy(driver):
+                try:
+                    cls._reset_app(driver, capabilities, reset)
+                    with cls.lock:
+                        cls.sessions[key] = pooled
+                    return driver
+                except:
+                    pass
+            cls._quit(driver)
+
+        driver = webdriver.Remote(
+            desired_capabilities=capabilities,
+            command_executor=command_executor or executor)
+
+        with cls.lock:
+            cls.sessions[key] = (signature, driver)
+        return driver
+
+    @classmethod
+    def discard(cls, driver):
+        """Quit a pooled session, e.g. when a test left the device in a bad state"""
+
+        with cls.lock:
+            for key, pooled in list(cls.sessions.items()):
+                if pooled[1] is driver:
+                    del cls.sessions[key]
+        cls._quit(driver)
+
+    @classmethod
+    def quit_all(cls):
+        with cls.lock:
+            sessions = list(cls.sessions.values())
+            cls.sessions.clear()
+        for _, driver in sessions:
+            cls._quit(driver)
+
+    @staticmethod
+    def _signature(capabilities):
+        return json.dumps(dict((key, value) for key, value in capabilities.items()
+                               if key not in PER_TEST_CAPABILITIES), sort_keys=True, default=str)
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            driver.get_window_size()
+            return True
+        except:
+            return False
+
+    @staticmethod
+    def _reset_app(driver, capabilities, reset):
+        """
+        Reset app state between tests. 'restart' terminates and activates the app,
+        'clear' resets it like a fast reset (clears app data)
+        """
+
+        app_id = SessionPool._app_id(driver, capabilities) if reset == 'restart' else None
+        if app_id and hasattr(driver, 'terminate_app'):
+            driver.terminate_app(app_id)
+            driver.activate_app(app_id)
+        else:
+            if reset == 'restart':
+                logging.getLogger(BASE + '.sessions').warning(
+                    'app id of the session is unknown, resetting the app instead of restarting it')
+            driver.reset()
+
+    @staticmethod
+    def _app_id(driver, capabilities):
+        """
+        Package or bundle id of the app under test. Sessions started with an APP
+        file only have it in the capabilities the session reports
+        """
+
+        session_capabilities = getattr(driver, 'capabilities', None) or {}
+        for source in (capabilities, session_capabilities):
+            app_id = source.get('appPackage') or source.get('bundleId') or source.get('CFBundleIdentifier')
+            if app_id:
+                return app_id
+        try:
+            # Android only
+            return driver.current_package
+        except:
+            return None
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except:
+            pass
+
+
+atexit.register(SessionPool.quit_all)
@@ -0,0 +1,155 @@
+import json
+import threading
+
+CALABASH_STEP_SUFFIX = '                                     # features/step_definitions/calabash_steps.rb'
+CALABASH_INFO = 'Then %s' + CALABASH_STEP_SUFFIX
+CALABASH_ERROR = 'Step unsuccessful: %s' + CALABASH_STEP_SUFFIX
+CALABASH_SCREENSHOT = ('- java -jar /usr/local/rvm/gems/ruby-2.1.2@global/gems/calabash-android-0.5.14/lib/'
+                       'calabash-android/lib/screenshotTaker.jar "04135148006060008790" "%s"')
+# Not steps of the test, testdroid would report them as such
+SKIPPED_EVENTS = ('span',)
+
+
+class TimestampCache(object):
+    """strftime of the second of a timestamp, computed once per second"""
+
+    def __init__(self, second_format):
+        super(TimestampCache, self).__init__()
+
+        self._format = second_format
+        # (second, text) swapped as one so threads never see a mismatched pair
+        self._cached = (None, None)
+
+    def seconds(self, timestamp):
+        second = timestamp.replace(microsecond=0)
+        cached_second, text = self._cached
+        if second != cached_second:
+            text = second.strftime(self._format)
+            self._cached = (second, text)
+        return text
+
+
+class EventSink(object):
+    """
+    Destination of events. write() gets the event data shared by all sinks of a
+    logger and must not modify it.
+    """
+
+    def write(self, data, timestamp, level='info'):
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def sync(self):
+        self.flush()
+
+
+class LoggerSink(EventSink):
+    """Sink writing formatted events through a logging.Logger"""
+
+    def __init__(self, logger):
+        super(LoggerSink, self).__init__()
+
+        self.logger = logger
+
+    def flush(self):
+        for handler in self.logger.handlers:
+            handler.flush()
+
+    def sync(self):
+        for handler in self.logger.handlers:
+            getattr(handler, 'sync', handler.flush)()
+
+
+class JsonSink(LoggerSink):
+    """One json object per line, the timestamp in iso format"""
+
+    def write(self, data, timestamp, level='info'):
+        data = dict(data)
+        data['timestamp'] = timestamp.isoformat()
+        if level == 'error':
+            self.logger.error(json.dumps(data))
+        else:
+            self.logger.info(json.dumps(data))
+
+
+class CalabashSink(LoggerSink):
+    """Calabash steps, the format testdroid reports"""
+
+    timestamps = TimestampCache('%H:%M:%S')
+
+    def write(self, data, timestamp, level='info'):
+        if (data.get('event') or {}).get('type') in SKIPPED_EVENTS:
+            return
+        log = self.logger.error if level == 'error' else self.logger.info
+        try:
+            log((CALABASH_ERROR if level == 'error' else CALABASH_INFO) % self.format(data, timestamp))
+        except Exception, e:
+            log("unhandled case in logger:")
+            log(str(e))
+            log(str(data))
+        if 'screenshot' in data:
+            self.logger.info(CALABASH_SCREENSHOT % data['screenshot'])
+
+    def format(self, data, timestamp):
+        parts = [self.timestamps.seconds(timestamp), ' - ']
+
+        # screenshot has no event data
+        event_data = data.get('event')
+        if event_data:
+            parts.extend((event_data.get('type'), ' "'))
+
+            element_data = data.get('element')
+            if element_data:
+                parts.extend((str(element_data), ' "'))
+
+            data_data = event_data.get('data')
+            if data_data:
+                parts.extend((str(data_data), '"'))
+
+        ss_str = data.get('screenshot')
+        if ss_str:
+            parts.extend((' - ', ss_str.split('/')[-1]))
+
+        return ''.join(parts)
+
+
+class CompactSink(EventSink):
+    """Binary format of testlio.eventcodec"""
+
+    def __init__(self, writer):
+        super(CompactSink, self).__init__()
+
+        self.writer = writer
+
+    def write(self, data, timestamp, level='info'):
+        self.writer.write(data, timestamp, level)
+
+    def flush(self):
+        self.writer.flush()
+
+    def sync(self):
+        self.writer.sync()
+
+
+class MemorySink(EventSink):
+    """Keeps events in memory, for tests of the framework itself"""
+
+    def __init__(self):
+        super(MemorySink, self).__init__()
+
+        self.events = []
+        self._lock = threading.Lock()
+
+    def write(self, data, timestamp, level='info'):
+        with self._lock:
+            self.events.append({'data': data, 'timestamp': timestamp, 'level': level})
+
+    def of_type(self, event_type):
+        with self._lock:
+            return [event for event in self.events if event['data'].get('event', {}).get('type') == event_type]
+
+    def clear(self):
+        with self._lock:
+            self.events = []
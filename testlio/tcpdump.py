@@ -4,6 +4,11 @@ import pytz
 from datetime import datetime, timedelta
 from time import sleep
 
+try:
+    from testlio.log import traced
+except ImportError:
+    from log import traced
+
 local = threading.local()
 
 
@@ -19,6 +24,7 @@ def init(tcpdump_file_name='./dump.txt', host='pubads.g.doubleclick.net', time_z
     local.time_zone_name = time_zone_name
 
 
+@traced('tcpdump.validate')
 def validate(uri_contains=None, uri_not_contains=None,
              from_offset_in_seconds=None, to_offset_in_seconds=None,
              from_date=None, to_date=None,
@@ -54,6 +60,7 @@ def validate(uri_contains=None, uri_not_contains=None,
     return valid
 
 
+@traced('tcpdump.validate_regex')
 def validate_regex(regex_pattern=None, search_on=SearchOn.PATH,
                    from_offset_in_seconds=None, to_offset_in_seconds=None,
                    from_date=None, to_date=None,
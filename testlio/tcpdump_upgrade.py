@@ -4,6 +4,11 @@ from time import sleep
 import pytz
 import re
 
+try:
+    from testlio.log import traced
+except ImportError:
+    from log import traced
+
 local = threading.local()
 
 ERRORS_CONTAINERS = []
@@ -15,6 +20,7 @@ def init(tcpdump_file_name='./dump.txt', host='pubads.g.doubleclick.net', time_z
     local.timezone = pytz.timezone(time_zone_name)
 
 
+@traced('tcpdump.validate')
 def validate(uri_contains=None, uri_not_contains=None,
              body_contains=None, body_not_contains=None,
              from_offset_in_seconds=None, to_offset_in_seconds=None,
@@ -0,0 +1,117 @@
+"""
+Export the spans of event logs to the Chrome trace event format, to be opened in
+chrome://tracing or https://ui.perfetto.dev as a flame chart.
+
+    python -m testlio.trace ./logs --output trace.json
+
+Spans are only logged when the tests run with TRACE_SPANS=true. Every test becomes a process of the trace, its threads keep their spans apart.
+Json lines logs (*.log and their rotated segments) and compact logs (*.events) are read.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+try:
+    from testlio.eventcodec import read_events
+    from testlio.log import DIR
+except ImportError:
+    from eventcodec import read_events
+    from log import DIR
+
+PHASES = {'begin': 'B', 'end': 'E'}
+# Logs, their rotated segments (A.test.log.1) and compact logs
+LOG_FILE = re.compile(r'\.(log(\.\d+)?|events)$')
+
+
+def _json_events(path):
+    with open(path) as log_file:
+        for line in log_file:
+            line = line.strip()
+            if not line.startswith('{'):
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                pass
+
+
+def _compact_events(path):
+    with open(path, 'rb') as log_file:
+        for _, _, data in read_events(log_file):
+            yield data
+
+
+def trace_events(path, pid):
+    """Chrome trace events of the spans logged in path, pid stands for the test"""
+
+    events = _compact_events(path) if path.endswith('.events') else _json_events(path)
+    for data in events:
+        event = data.get('event')
+        if not isinstance(event, dict) or event.get('type') != 'span':
+            continue
+
+        span = event.get('data', {})
+        args = dict(span.get('args') or {})
+        if span.get('phase') == 'end':
+            args['duration'] = span.get('duration')
+            if span.get('error'):
+                args['error'] = span['error']
+
+        yield {
+            'name': span.get('name'),
+            'cat': 'testlio',
+            'ph': PHASES.get(span.get('phase'), 'i'),
+            'ts': int(span.get('clock', 0) * 1000000),
+            'pid': pid,
+            'tid': span.get('thread') or 0,
+            'args': args
+        }
+
+
+def log_files(paths):
+    """Log files of paths, directories are searched for *.log, their segments and *.events"""
+
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if LOG_FILE.search(name):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def export(paths, target):
+    """Write the trace of all logs in paths as json to target"""
+
+    events = []
+    pids = {}
+    for path in log_files(paths):
+        # segments of a rotated log belong to the same test
+        test = LOG_FILE.sub('', os.path.basename(path))
+        if test not in pids:
+            pids[test] = len(pids) + 1
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pids[test], 'args': {'name': test}})
+        events.extend(trace_events(path, pids[test]))
+    json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, target)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(prog='python -m testlio.trace',
+                                     description='Chrome trace event export of logged spans')
+    parser.add_argument('paths', nargs='*', default=[DIR], help='log files or directories (default: %s)' % DIR)
+    parser.add_argument('--output', help='trace file (default: stdout)')
+    options = parser.parse_args(args)
+
+    if options.output:
+        with open(options.output, 'w') as target:
+            export(options.paths, target)
+    else:
+        export(options.paths, sys.stdout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
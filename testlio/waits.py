@@ -0,0 +1,91 @@
+import threading
+from time import sleep
+
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+try:
+    from testlio.deadline import _monotonic
+except ImportError:
+    from deadline import _monotonic
+
+# Like WebDriverWait, a missing element only means "not yet"
+IGNORED_EXCEPTIONS = (NoSuchElementException,)
+
+FIRST_POLL = 0.1
+MAX_POLL = 1.0
+BACKOFF = 2
+
+
+class ConditionWait(object):
+    """
+    Drop-in for WebDriverWait with adaptive polling: the first polls are quick,
+    then the interval grows exponentially up to max_poll. The timeout is clamped
+    to the test deadline and every wait is recorded in stats.
+    """
+
+    def __init__(self, driver, timeout, ignored_exceptions=None, deadline=None, stats=None, name='wait',
+                 first_poll=FIRST_POLL, max_poll=MAX_POLL, backoff=BACKOFF):
+        super(ConditionWait, self).__init__()
+
+        self._driver = driver
+        self._timeout = deadline.clamp(timeout) if deadline else timeout
+        self._ignored_exceptions = IGNORED_EXCEPTIONS + tuple(ignored_exceptions or ())
+        self._stats = stats
+        self._name = name
+        self._first_poll = first_poll
+        self._max_poll = max_poll
+        self._backoff = backoff
+
+    def until(self, method, message=''):
+        """Poll method(driver) until it returns a truthy value, which is returned"""
+
+        started = _monotonic()
+        end = started + self._timeout
+        poll = self._first_poll
+        polls = 0
+
+        while True:
+            polls += 1
+            try:
+                value = method(self._driver)
+                if value:
+                    self._record(started, polls, True)
+                    return value
+            except self._ignored_exceptions:
+                pass
+
+            remaining = end - _monotonic()
+            if remaining <= 0:
+                break
+            sleep(min(poll, remaining))
+            poll = min(poll * self._backoff, self._max_poll)
+
+        self._record(started, polls, False)
+        raise TimeoutException(message)
+
+    def _record(self, started, polls, satisfied):
+        if self._stats is not None:
+            self._stats.record(self._name, _monotonic() - started, polls, satisfied)
+
+
+class WaitStats(object):
+    """Number of waits, timeouts, polls and time spent waiting, grouped by wait name"""
+
+    def __init__(self):
+        super(WaitStats, self).__init__()
+
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, polls, satisfied):
+        with self._lock:
+            stats = self._stats.setdefault(name, {'count': 0, 'timeouts': 0, 'polls': 0, 'seconds': 0.0})
+            stats['count'] += 1
+            stats['polls'] += polls
+            stats['seconds'] += seconds
+            if not satisfied:
+                stats['timeouts'] += 1
+
+    def summary(self):
+        with self._lock:
+            return dict((name, dict(stats)) for name, stats in self._stats.items())
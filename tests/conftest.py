@@ -0,0 +1,97 @@
+import re
+import time
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from testlio.base import TestlioAutomationTest
+from testlio.locators import ACCESSIBILITY_ID
+from testlio.log import EventLogger
+
+NAME_XPATH_VALUE = re.compile(r'abcdefghijklmnopqrstuvwxyz"\),"(.*?)"\)')
+TEXT_XPATH_VALUE = re.compile(r'^//\*\[@text="(.*)"\]$')
+
+
+class FakeElement(object):
+    """Android element with text, content-desc and resource-id attributes"""
+
+    def __init__(self, element_id, text='', content_desc='', resource_id='', appears_at=0):
+        self.id = element_id
+        self.attributes = {'text': text, 'content-desc': content_desc, 'resource-id': resource_id}
+        self.appears_at = appears_at
+        self.location = {'x': 10, 'y': 10}
+        self.size = {'width': 10, 'height': 10}
+        self.clicks = 0
+
+    @property
+    def text(self):
+        return self.attributes['text']
+
+    def get_attribute(self, name):
+        return self.attributes.get({'resourceId': 'resource-id', 'contentDescription': 'content-desc'}.get(name, name))
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def click(self):
+        self.clicks += 1
+
+    def matches(self, by, value):
+        if by == By.ID:
+            return self.attributes['resource-id'] == value
+        if by == ACCESSIBILITY_ID:
+            return self.attributes['content-desc'] == value
+        if by == By.XPATH:
+            name = NAME_XPATH_VALUE.search(value)
+            if name:
+                return any(name.group(1) in self.attributes[key].lower() for key in ('text', 'content-desc'))
+            text = TEXT_XPATH_VALUE.match(value)
+            return bool(text) and self.attributes['text'] == text.group(1)
+        return False
+
+
+class FakeDriver(object):
+    """Just enough of a webdriver for the finders, elements can show up after a delay"""
+
+    def __init__(self, elements=None):
+        self.elements = list(elements or [])
+        self.current_activity = '.Main'
+        self.started = time.time()
+        self.finds = 0
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def find_elements(self, by, value):
+        self.finds += 1
+        elapsed = time.time() - self.started
+        return [element for element in self.elements if element.appears_at <= elapsed and element.matches(by, value)]
+
+    def find_element(self, by, value):
+        found = self.find_elements(by, value)
+        if not found:
+            raise NoSuchElementException('no element for %s %s' % (by, value))
+        return found[0]
+
+
+class FakeTest(TestlioAutomationTest):
+    def runTest(self):
+        pass
+
+
+@pytest.fixture
+def test_case(tmpdir, monkeypatch):
+    """TestlioAutomationTest on a fake Android driver, logs go to a temporary directory"""
+
+    monkeypatch.chdir(str(tmpdir))
+    test = FakeTest()
+    test.driver = FakeDriver()
+    test.name = 'FakeTest.runTest'
+    test.event = EventLogger(test.name, 'testlio')
+    test.IS_ANDROID = True
+    yield test
+    test.event.close()
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import datetime
+import io
+import json
+
+from testlio.analyze import main, parse_calabash_line, parse_json_line
+from testlio.sinks import CALABASH_INFO
+
+
+def _json_line(event_type, data=None):
+    return json.dumps({'timestamp': '2020-01-01T10:00:00.5', 'event': {'type': event_type, 'data': data}})
+
+
+def test_json_steps_are_parsed():
+    timestamp, event_type, element, failed = parse_json_line(_json_line('click'))
+
+    assert (timestamp, event_type, element, failed) == (datetime.datetime(2020, 1, 1, 10, 0, 0, 500000), 'click',
+                                                        None, False)
+
+
+def test_json_events_about_the_run_are_skipped():
+    for event_type in ('span', 'latency', 'lifecycle'):
+        assert parse_json_line(_json_line(event_type, {'name': 'find'})) is None
+
+
+def test_calabash_events_about_the_run_are_skipped():
+    day = datetime.date(2020, 1, 1)
+
+    assert parse_calabash_line(CALABASH_INFO % '10:00:00 - click "{}"', day)[1] == 'click'
+    for event_type in ('span', 'latency', 'lifecycle'):
+        assert parse_calabash_line(CALABASH_INFO % ('10:00:00 - %s "{}"' % event_type), day) is None
+
+
+def test_csv_report_of_non_ascii_failures(tmpdir):
+    logs = tmpdir.mkdir('logs')
+    logs.join('T.test.log').write_binary(b'\n'.join([
+        _json_line('click').encode('utf-8'),
+        _json_line('assert', u"*** FAILURE *** Element is missing: 'Prüfung'").encode('utf-8')]) + b'\n')
+    report = str(tmpdir.join('report.csv'))
+
+    assert main([str(logs), '--format', 'csv', '--jobs', '1', '--output', report]) == 0
+    with io.open(report, encoding='utf-8') as report_file:
+        assert u"Element is missing: 'Prüfung'" in report_file.read()
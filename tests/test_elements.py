@@ -0,0 +1,59 @@
+import threading
+
+from testlio.elements import ElementCache
+
+from conftest import FakeElement
+
+
+def _caching(test_case):
+    test_case.element_cache = ElementCache()
+    return test_case.element_cache
+
+
+def test_relabelled_element_is_gone_for_not_exists(test_case):
+    _caching(test_case)
+    label = FakeElement('1', text='Loading')
+    test_case.driver.elements.append(label)
+    assert test_case.get_element(name='loading', timeout=1)
+
+    relabel = threading.Timer(0.5, lambda: label.attributes.update(text='Done'))
+    relabel.start()
+    try:
+        assert test_case.not_exists(name='loading', timeout=3)
+    finally:
+        relabel.cancel()
+    assert not test_case.exists(name='loading', timeout=0)
+
+
+def test_id_lookups_are_cached_on_the_same_screen(test_case):
+    _caching(test_case)
+    test_case.driver.elements.append(FakeElement('1', resource_id='submit'))
+
+    found = test_case.get_element(id='submit', timeout=1)
+    finds = test_case.driver.finds
+    assert test_case.get_element(id='submit', timeout=1) is found
+    assert test_case.driver.finds == finds
+
+    test_case.driver.current_activity = '.Settings'
+    test_case.get_element(id='submit', timeout=1)
+    assert test_case.driver.finds > finds
+
+
+def test_exists_does_not_use_the_cache(test_case):
+    _caching(test_case)
+    test_case.driver.elements.append(FakeElement('1', resource_id='submit'))
+    assert test_case.get_element(id='submit', timeout=1)
+
+    del test_case.driver.elements[:]
+    assert not test_case.exists(id='submit', timeout=0)
+
+
+def test_lookups_by_name_and_xpath_are_not_cached():
+    cache = ElementCache()
+
+    cache.put({'name': 'Log in'}, FakeElement('1'), '.Main')
+    cache.put({'xpath': '//*[@text="Log in"]'}, FakeElement('2'), '.Main')
+    cache.put({'id': 'submit'}, FakeElement('3'), None)
+    assert cache.get({'name': 'Log in'}, '.Main') is None
+    assert cache.get({'xpath': '//*[@text="Log in"]'}, '.Main') is None
+    assert cache.get({'id': 'submit'}, None) is None
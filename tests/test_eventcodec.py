@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import datetime
+import gc
+import io
+import json
+import time
+
+from testlio.eventcodec import EventEncoder, read_events, timestamp_micros, to_json_lines
+
+TIMESTAMP = datetime.datetime(2020, 1, 1, 10, 0, 0, 500)
+
+
+def _events(count):
+    events = []
+    for index in range(count):
+        timestamp = TIMESTAMP + datetime.timedelta(milliseconds=index)
+        kind = index % 4
+        if kind == 0:
+            data = {'event': {'type': 'find'}, 'element': {'name': 'Submit %d' % (index % 50), 'timeout': 10}}
+        elif kind == 1:
+            data = {'event': {'type': 'click', 'data': 'Clicked element'}, 'element': {'name': 'Submit %d' % (index % 50)}}
+        elif kind == 2:
+            data = {'event': {'type': 'send_keys', 'data': 'hello world %d' % index}, 'element': {'id': 'field'}}
+        else:
+            data = {'event': {'type': 'validation', 'data': 'Element exists'}, 'screenshot': '/tmp/%d.png' % index}
+        events.append((data, timestamp))
+    return events
+
+
+def _encoded(events, level='info'):
+    encoder = EventEncoder()
+    return b''.join(encoder.encode(data, timestamp, level) for data, timestamp in events)
+
+
+def _round_trip(events, level='info'):
+    return list(read_events(io.BytesIO(_encoded(events, level))))
+
+
+def test_flat_events_round_trip():
+    events = _events(40)
+
+    decoded = _round_trip(events)
+    assert [data for _, _, data in decoded] == [data for data, _ in events]
+    assert [micros for _, micros, _ in decoded] == [timestamp_micros(timestamp) for _, timestamp in events]
+
+
+def test_other_events_round_trip():
+    events = [
+        ({'screenshot': u'/tmp/ä.png'}, TIMESTAMP),
+        ({'event': {'type': u'assert', 'data': u'Prüfung *** FAILURE ***'}}, TIMESTAMP),
+        ({'event': {'type': 'span', 'data': {'name': 'find', 'phase': 'begin', 'clock': 1.5}}}, TIMESTAMP),
+        ({'event': {'type': 'click', 'data': None}}, TIMESTAMP),
+        ({'error': 'boom', 'event': {'type': 'click'}}, TIMESTAMP),
+        # an element that can't be hashed after a new event type
+        ({'event': {'type': 'swipe'}, 'element': {'points': [1, 2]}}, TIMESTAMP),
+        ({'event': {'type': 'swipe'}, 'element': {'name': 'list'}}, TIMESTAMP),
+    ]
+
+    decoded = _round_trip(events, 'error')
+    assert [data for _, _, data in decoded] == [data for data, _ in events]
+    assert set(level for level, _, _ in decoded) == set(['error'])
+
+
+def test_truncated_last_event_is_dropped():
+    encoded = _encoded(_events(3))
+
+    assert len(list(read_events(io.BytesIO(encoded[:-1])))) == 2
+
+
+def test_json_lines_match_the_json_log():
+    data, timestamp = _events(2)[1]
+    target = io.StringIO() if str is not bytes else io.BytesIO()
+
+    to_json_lines(io.BytesIO(_encoded([(data, timestamp)])), target)
+    assert json.loads(target.getvalue()) == dict(data, timestamp=timestamp.isoformat())
+
+
+def _best_of(runs, function):
+    best = None
+    gc.disable()
+    try:
+        for _ in range(runs):
+            started = time.time()
+            function()
+            elapsed = time.time() - started
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        gc.enable()
+    return best
+
+
+def test_faster_and_smaller_than_json_lines():
+    events = _events(20000)
+
+    def write_json():
+        return b''.join((json.dumps(dict(data, timestamp=timestamp.isoformat())) + '\n').encode('utf-8')
+                        for data, timestamp in events)
+
+    json_lines = write_json()
+    encoded = _encoded(events)
+
+    assert _best_of(5, lambda: _encoded(events)) < _best_of(5, write_json)
+    assert _best_of(5, lambda: list(read_events(io.BytesIO(encoded)))) < \
+        _best_of(5, lambda: [json.loads(line) for line in io.BytesIO(json_lines)])
+    assert len(encoded) < len(json_lines) / 2
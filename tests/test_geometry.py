@@ -0,0 +1,58 @@
+import pytest
+from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
+
+from testlio.geometry import ViewportGeometry
+
+from conftest import FakeElement
+
+
+class RotatingDriver(object):
+    """Driver whose orientation the app can change behind the test's back"""
+
+    def __init__(self):
+        self.orientation = 'PORTRAIT'
+        self.size_reads = 0
+
+    def get_window_size(self):
+        self.size_reads += 1
+        if self.orientation == 'PORTRAIT':
+            return {'width': 100, 'height': 200}
+        return {'width': 200, 'height': 100}
+
+
+class RectElement(FakeElement):
+    def __init__(self, error):
+        super(RectElement, self).__init__('1')
+        self.error = error
+
+    @property
+    def rect(self):
+        raise self.error
+
+
+def test_window_size_follows_rotations_outside_set_orientation():
+    driver = RotatingDriver()
+    geometry = ViewportGeometry(driver)
+
+    assert geometry.window_size()['width'] == 100
+    driver.orientation = 'LANDSCAPE'
+    assert geometry.window_size()['width'] == 200
+    driver.orientation = 'PORTRAIT'
+    assert geometry.window_size()['width'] == 100
+    assert driver.size_reads == 2
+
+
+def test_stale_element_keeps_rect_supported():
+    geometry = ViewportGeometry(RotatingDriver())
+
+    with pytest.raises(StaleElementReferenceException):
+        geometry.rect(RectElement(StaleElementReferenceException('stale')))
+    assert geometry._rect_supported
+
+
+def test_unknown_rect_command_falls_back_to_location_and_size():
+    geometry = ViewportGeometry(RotatingDriver())
+
+    assert geometry.rect(RectElement(WebDriverException('unknown command'))) == {'x': 10, 'y': 10, 'width': 10,
+                                                                                  'height': 10}
+    assert not geometry._rect_supported
@@ -0,0 +1,77 @@
+import threading
+import unittest
+
+from testlio import lifecycle
+from testlio.lifecycle import SessionPipeline
+from testlio.scheduler import DevicePool
+
+EXECUTOR = 'http://host:4723/wd/hub'
+CAPABILITIES = {'udid': 'emulator-5554', 'platformName': 'Android'}
+
+
+class Driver(object):
+    def __init__(self, **kwargs):
+        self.quits = 0
+
+    def quit(self):
+        self.quits += 1
+
+
+class Event(object):
+    def flush(self):
+        pass
+
+
+def _reset():
+    SessionPipeline.drain()
+    SessionPipeline.timings = {}
+
+
+def test_background_timings_are_bounded_and_taken_once():
+    _reset()
+    for index in range(SessionPipeline.max_timings + 2):
+        SessionPipeline.retire('T.test_%d' % index, Driver(), Event(), EXECUTOR, CAPABILITIES)
+    SessionPipeline.drain()
+
+    timings = SessionPipeline.take_timings(EXECUTOR, CAPABILITIES)
+    assert len(timings) == SessionPipeline.max_timings
+    assert timings[-1]['test'] == 'T.test_%d' % (SessionPipeline.max_timings + 1)
+    assert set(timings[-1]) == set(['test', 'log_flush', 'session_quit'])
+    assert SessionPipeline.take_timings(EXECUTOR, CAPABILITIES) == []
+
+
+def test_drain_abandons_a_prefetch_still_being_created(monkeypatch):
+    _reset()
+    created = threading.Event()
+    monkeypatch.setattr(lifecycle.webdriver, 'Remote', lambda **kwargs: created.wait(5) and Driver())
+
+    SessionPipeline.prefetch(EXECUTOR, CAPABILITIES)
+    _, call = SessionPipeline.prefetched[(EXECUTOR, 'emulator-5554')]
+    assert call.daemon
+
+    SessionPipeline.drain()
+    assert call.is_alive()
+    assert not SessionPipeline.prefetched
+    created.set()
+    call.join()
+
+
+def test_device_pool_skips_the_prefetch_after_the_last_test(tmpdir):
+    tmpdir.chdir()
+    prefetches = []
+
+    class Recorded(unittest.TestCase):
+        def setup_method(self, method):
+            pass
+
+        def teardown_method(self, method):
+            prefetches.append(self.prefetch_next)
+
+        def test_a(self):
+            pass
+
+        def test_b(self):
+            pass
+
+    DevicePool([(EXECUTOR, 'emulator-5554')], summary_file=str(tmpdir.join('summary.json'))).run(Recorded)
+    assert prefetches == [True, False]
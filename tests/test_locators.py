@@ -0,0 +1,60 @@
+from selenium.webdriver.common.by import By
+
+from testlio.locators import ACCESSIBILITY_ID, NameLocatorCache, candidate_locators, encodes_name
+
+from conftest import FakeElement
+
+
+def _learning(test_case, tmpdir):
+    test_case.locator_cache = NameLocatorCache(str(tmpdir.join('locator_cache.json')))
+    return test_case.locator_cache
+
+
+def test_learnt_locator_is_used_for_the_name(test_case, tmpdir):
+    cache = _learning(test_case, tmpdir)
+    test_case.driver.elements.append(FakeElement('1', text='Logged in', resource_id='status'))
+
+    assert test_case.get_element(name='logged in', timeout=1).id == '1'
+    key = cache.key(None, '.Main', 'element', 'logged in')
+    assert cache.get(key) == (By.XPATH, '//*[@text="Logged in"]')
+    assert test_case.get_element(name='logged in', timeout=1).id == '1'
+
+
+def test_learnt_locator_does_not_match_a_relabelled_element(test_case, tmpdir):
+    _learning(test_case, tmpdir)
+    status = FakeElement('1', text='Logged in', resource_id='status')
+    test_case.driver.elements.append(status)
+    assert test_case.exists(name='logged in', timeout=1)
+
+    status.attributes['text'] = 'Logged out'
+    assert not test_case.exists(name='logged in', timeout=0)
+    assert test_case.not_exists(name='logged in', timeout=1)
+
+
+def test_stale_learnt_locator_falls_back_to_the_name(test_case, tmpdir):
+    cache = _learning(test_case, tmpdir)
+    test_case.driver.elements.append(FakeElement('1', text='Sign in'))
+    key = cache.key(None, '.Main', 'element', 'sign')
+    cache.put(key, (ACCESSIBILITY_ID, 'Sign up'))
+
+    assert test_case.get_element(name='sign', timeout=1).id == '1'
+    assert cache.get(key) == (By.XPATH, '//*[@text="Sign in"]')
+
+
+def test_locators_not_encoding_the_name_are_not_trusted(test_case, tmpdir):
+    cache = _learning(test_case, tmpdir)
+    test_case.driver.elements.append(FakeElement('1', text='Logged out', resource_id='status'))
+    key = cache.key(None, '.Main', 'element', 'logged in')
+    # learnt by an earlier version
+    cache.put(key, (By.ID, 'status'))
+
+    assert not test_case.exists(name='logged in', timeout=0)
+    assert cache.get(key) is None
+
+
+def test_candidate_locators_contain_the_name():
+    element = FakeElement('1', text='Submit order', content_desc='checkout', resource_id='submit')
+
+    assert candidate_locators(element, 'submit') == [(By.XPATH, '//*[@text="Submit order"]')]
+    assert not encodes_name((By.XPATH, '//*[@text="Logged in"]'), 'text')
+    assert encodes_name((ACCESSIBILITY_ID, 'Checkout'), 'CHECK')
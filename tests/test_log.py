@@ -0,0 +1,31 @@
+import json
+
+from testlio.log import EventLogger
+
+
+def _events(path):
+    with open(path) as log_file:
+        return [json.loads(line)['event']['type'] for line in log_file if line.strip()]
+
+
+def test_loggers_closed_beyond_the_limit_reopen_their_file(tmpdir, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    monkeypatch.setattr(EventLogger, 'max_open_loggers', 2)
+    events = [EventLogger('T.test_%d' % index, 'testlio') for index in range(4)]
+    try:
+        for event in events:
+            event.start()
+        assert len(EventLogger.loggers) == 2
+
+        for event in events:
+            event.click('Clicked element')
+            event.stop()
+        assert len(EventLogger.loggers) == 2
+    finally:
+        for event in events:
+            event.close()
+
+    for index in range(4):
+        assert _events('logs/T.test_%d.log' % index) == ['start', 'click', 'stop']
+    assert not EventLogger.loggers
+    assert not EventLogger.file_handlers
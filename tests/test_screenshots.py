@@ -0,0 +1,29 @@
+import subprocess
+
+
+def _commands(test_case, monkeypatch, platform):
+    commands = []
+    monkeypatch.setattr(subprocess, 'call', lambda command, shell=False: commands.append(command))
+    monkeypatch.setattr(test_case, '_sleep', lambda seconds: None)
+    monkeypatch.setenv('IOS_UDID', 'environment-udid')
+    test_case.capabilities = {'platformName': platform, 'udid': 'pool-udid'}
+    test_case.device = {'executor': 'http://localhost:4723/wd/hub', 'udid': 'pool-udid'}
+    return commands
+
+
+def test_ios_screenshot_of_the_assigned_device(test_case, monkeypatch):
+    commands = _commands(test_case, monkeypatch, 'iOS')
+
+    assert test_case._capture_screenshot('shot.png') == 'shot.png'
+    assert 'idevicescreenshot -u pool-udid "shot.png"' in commands[-1]
+
+
+def test_android_fallback_screenshot_of_the_assigned_device(test_case, monkeypatch):
+    commands = _commands(test_case, monkeypatch, 'Android')
+
+    def save_screenshot(path):
+        raise IOError('no session')
+    test_case.driver.save_screenshot = save_screenshot
+
+    assert test_case._capture_screenshot('shot.png') == 'shot.png'
+    assert commands[-1].startswith('adb -s pool-udid shell screencap')
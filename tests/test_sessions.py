@@ -0,0 +1,46 @@
+from testlio.sessions import SessionPool
+
+
+class AppDriver(object):
+    """Session of an app installed from an APP file, its package is only known to the session"""
+
+    def __init__(self, capabilities=None, current_package=None):
+        self.capabilities = capabilities or {}
+        self.package = current_package
+        self.calls = []
+
+    @property
+    def current_package(self):
+        if self.package is None:
+            raise AttributeError('not an Android session')
+        return self.package
+
+    def terminate_app(self, app_id):
+        self.calls.append(('terminate_app', app_id))
+
+    def activate_app(self, app_id):
+        self.calls.append(('activate_app', app_id))
+
+    def reset(self):
+        self.calls.append(('reset',))
+
+
+def test_restart_resolves_the_package_of_an_app_file():
+    driver = AppDriver(current_package='com.example.app')
+
+    SessionPool._reset_app(driver, {'app': '/apps/example.apk'}, 'restart')
+    assert driver.calls == [('terminate_app', 'com.example.app'), ('activate_app', 'com.example.app')]
+
+
+def test_restart_resolves_the_bundle_id_from_the_session():
+    driver = AppDriver(capabilities={'CFBundleIdentifier': 'com.example.ios'})
+
+    SessionPool._reset_app(driver, {'app': '/apps/example.ipa'}, 'restart')
+    assert driver.calls[0] == ('terminate_app', 'com.example.ios')
+
+
+def test_restart_without_app_id_resets():
+    driver = AppDriver()
+
+    SessionPool._reset_app(driver, {'app': '/apps/example.ipa'}, 'restart')
+    assert driver.calls == [('reset',)]
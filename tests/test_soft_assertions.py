@@ -0,0 +1,31 @@
+import os
+
+from testlio.assertions import SoftAssertions
+from testlio.base import FAILURES_FOUND, HASHED_VALUES, SOFT_ASSERTIONS_FAILURES
+
+
+def _soft_assertions(test_case, monkeypatch):
+    # restored after the test
+    for name in (FAILURES_FOUND, HASHED_VALUES, SOFT_ASSERTIONS_FAILURES):
+        monkeypatch.setenv(name, '')
+    test_case.soft_assertions = SoftAssertions(on_failure=test_case._on_soft_failure)
+    os.environ[FAILURES_FOUND] = 'false'
+    return test_case.soft_assertions
+
+
+def test_missing_page_source_text_is_reported_but_does_not_fail(test_case, monkeypatch):
+    soft_assertions = _soft_assertions(test_case, monkeypatch)
+    test_case.driver.page_source = '<hierarchy><node text="Log in"/></hierarchy>'
+
+    test_case.exists_in_page_source('Sign up')
+    assert not soft_assertions.failed
+    assert os.environ[FAILURES_FOUND] == 'false'
+
+    soft_assertions.add("Element is missing: 'Submit'")
+    assert soft_assertions.failed
+    assert os.environ[FAILURES_FOUND] == 'true'
+    # the messages are only copied at teardown
+    assert os.environ[SOFT_ASSERTIONS_FAILURES] == ''
+
+    test_case._publish_soft_assertions()
+    assert os.environ[SOFT_ASSERTIONS_FAILURES] == "\nElement is missing: 'Sign up'\nElement is missing: 'Submit'"
@@ -0,0 +1,43 @@
+import logging
+
+from testlio.log import EventLogger
+from testlio.sinks import CalabashSink, MemorySink
+
+from conftest import FakeElement
+
+
+def test_traced_finder_accepts_name_locator(test_case):
+    test_case.driver.elements.append(FakeElement('1', text='Log in'))
+
+    assert test_case.get_element(name='log in', timeout=1).id == '1'
+    assert test_case.exists(name='log in', timeout=1)
+
+
+def test_traced_finder_accepts_name_locator_with_spans_disabled(test_case, monkeypatch):
+    monkeypatch.setattr(EventLogger, 'disabled_events', set(['span']))
+    test_case.driver.elements.append(FakeElement('1', text='Log in'))
+
+    assert test_case.get_element(name='log in', timeout=1).id == '1'
+
+
+def test_spans_are_off_by_default(test_case):
+    memory = MemorySink()
+    test_case.event.sinks = [memory]
+    test_case.driver.elements.append(FakeElement('1', text='Log in'))
+
+    test_case.get_element(name='log in', timeout=1)
+    assert memory.of_type('span') == []
+
+
+def test_spans_stay_out_of_calabash_log(test_case, monkeypatch):
+    monkeypatch.setattr(EventLogger, 'trace_spans', True)
+    memory = MemorySink()
+    calabash = CalabashSink(logging.getLogger('test_spans.calabash'))
+    lines = []
+    monkeypatch.setattr(calabash.logger, 'info', lines.append)
+    test_case.event.sinks = [memory, calabash]
+    test_case.driver.elements.append(FakeElement('1', text='Log in'))
+
+    test_case.get_element(name='log in', timeout=1)
+    assert [event['data']['event']['data']['phase'] for event in memory.of_type('span')] == ['begin', 'end']
+    assert not any(' - span ' in line for line in lines)
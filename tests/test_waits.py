@@ -0,0 +1,20 @@
+import time
+
+from conftest import FakeElement
+
+
+def test_clickable_element_is_waited_for(test_case):
+    test_case.driver.elements.append(FakeElement('1', resource_id='login', appears_at=0.5))
+
+    started = time.time()
+    found = test_case.get_clickable_element(id='login', timeout=5)
+
+    assert found and found.id == '1'
+    assert 0.4 < time.time() - started < 5
+
+
+def test_missing_element_times_out(test_case):
+    started = time.time()
+
+    assert test_case.get_clickable_element(id='login', timeout=0.5) is False
+    assert time.time() - started >= 0.5